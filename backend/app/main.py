@@ -3,18 +3,23 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from uuid import uuid4
-from datetime import datetime, timezone
 import asyncio
+from collections import OrderedDict
+import hashlib
+from contextlib import AsyncExitStack, asynccontextmanager
 import logging
 import mimetypes
+import operator
+import random
 import time
 import re
+import secrets
 
 import os
-from typing import Literal
+from typing import Any, Final, Generic, Literal, TypeVar
 
 import httpx
+import orjson
 import tempfile
 
 from fastapi import (
@@ -24,15 +29,25 @@ from fastapi import (
     File,
     Form,
     HTTPException,
+    Query,
     Request,
     UploadFile,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    ORJSONResponse,
+    Response,
+    StreamingResponse,
+)
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.models.speech_turn import SpeechTurnAnalysis, SpeechTurnResponse
 from app.security import (
+    AUDIO_TOKEN_TTL_MINUTES,
     AuthContext,
     add_redaction_filter,
     create_audio_token,
@@ -43,6 +58,7 @@ from app.security import (
     require_scopes,
     revoke_refresh_token,
     rotate_refresh_token,
+    sweep_refresh_tokens,
     verify_audio_token,
     verify_password,
 )
@@ -54,22 +70,123 @@ from app.services.speech_turn import (
     _ensure_character_breakdown,
     _has_character_level_breakdown,
     _build_response_parts,
+    _wrap_pcm_as_wav,
+    sweep_audio_dir,
 )
 
 logging.basicConfig(level=logging.INFO)
 add_redaction_filter()
 
-app = FastAPI(title="Chinese Tutor API", version="0.1.0")
-_speech_service: SpeechTurnService | None = None    
 logger = logging.getLogger(__name__)
 
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+GEMINI_CHAT_MODEL_URL = f"{GEMINI_API_BASE}/models/gemini-2.5-flash"
+GEMINI_GENERATE_URL = f"{GEMINI_CHAT_MODEL_URL}:generateContent"
+GEMINI_STREAM_URL = f"{GEMINI_CHAT_MODEL_URL}:streamGenerateContent"
+GEMINI_BATCH_URL = f"{GEMINI_CHAT_MODEL_URL}:batchGenerateContent"
+GEMINI_JSON_HEADERS = {"Content-Type": "application/json"}
+
+GEMINI_HTTP_TIMEOUT = httpx.Timeout(30.0)
+GEMINI_HTTP_LIMITS = httpx.Limits(
+    max_connections=300,
+    max_keepalive_connections=100,
+    keepalive_expiry=60,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Production runs on uvloop (`uvicorn --loop uvloop`, see render.yaml); the
+    # app itself is loop-agnostic, so plain asyncio still works locally.
+    # One pooled client per process so Gemini calls reuse TLS connections.
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=GEMINI_HTTP_TIMEOUT,
+        limits=GEMINI_HTTP_LIMITS,
+    )
+    refresh_sweeper = asyncio.create_task(sweep_refresh_tokens())
+    audio_sweeper = asyncio.create_task(sweep_audio_dir(AUDIO_DIR))
+    try:
+        yield
+    finally:
+        refresh_sweeper.cancel()
+        audio_sweeper.cancel()
+        await app.state.http.aclose()
+        # The cached service clients hold the pool that was just closed.
+        _reset_http_clients()
+
+
+app = FastAPI(
+    title="Chinese Tutor API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+_speech_service: SpeechTurnService | None = None
+_debug_tts_client: ElevenLabsTTSClient | None = None
+
+
+def _reset_http_clients() -> None:
+    global _speech_service, _debug_tts_client
+    _speech_service = None
+    _debug_tts_client = None
+
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """Size-capped TTL map, evicting least recently used entries."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self._maxsize = maxsize
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: str) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: V) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+
 AUDIO_DIR = os.path.join(tempfile.gettempdir(), "chinese_tutor_audio")
 os.makedirs(AUDIO_DIR, exist_ok=True)
-AUDIO_JOBS: dict[str, dict[str, str | None]] = {}
+# Clients poll for pending TTS shortly after the turn; finished jobs only need to
+# outlive that window.
+AUDIO_JOBS: TTLCache[dict[str, str | None]] = TTLCache(
+    maxsize=int(os.getenv("AUDIO_JOBS_MAX_ENTRIES", "10000")),
+    ttl_seconds=int(os.getenv("AUDIO_JOBS_TTL_SECONDS", "3600")),
+)
+# Set when a pending audio job finishes, so long-polling readers wake immediately.
+AUDIO_JOB_DONE: dict[str, asyncio.Event] = {}
+MAX_AUDIO_JOB_WAIT_MS = 10000
+# Batch jobs are polled for a while after submission; drop them once that window passes.
+CHAT_BATCH_JOBS: TTLCache[dict[str, object]] = TTLCache(
+    maxsize=int(os.getenv("CHAT_BATCH_JOBS_MAX_ENTRIES", "10000")),
+    ttl_seconds=int(os.getenv("CHAT_BATCH_JOBS_TTL_SECONDS", "86400")),
+)
 
 MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", "10485760"))
+# Provider keys are fixed for the life of the process; changing them needs a restart.
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development").lower()
 IS_PRODUCTION = ENVIRONMENT == "production"
+# The combined login-and-turn route is for smoke runs only; off unless asked for.
+SMOKE_ENDPOINTS_ENABLED = os.getenv("ENABLE_SMOKE_ENDPOINTS", "").lower() in {"1", "true", "yes"}
 
 COOKIE_NAME = "refresh_token"
 
@@ -85,32 +202,120 @@ def _resolve_voice_name(voice: str) -> str:
 
 
 class RateLimiter:
-    def __init__(self) -> None:
-        self._requests: dict[str, list[float]] = {}
+    """Sliding-window counter: per route and client, only the current and previous window counts are kept."""
 
-    def check(self, key: str, limit: int, window_seconds: int) -> None:
-        now = time.time()
-        window_start = now - window_seconds
-        timestamps = [t for t in self._requests.get(key, []) if t >= window_start]
-        if len(timestamps) >= limit:
+    GC_EVERY = 1024
+
+    def __init__(self) -> None:
+        # route -> client -> (window_index, current_count, previous_count, window_seconds)
+        self._buckets: dict[str, dict[str, tuple[int, int, int, int]]] = {}
+        self._calls = 0
+
+    def check(self, route: str, client: str, limit: int, window_seconds: int) -> None:
+        now = time.monotonic()
+        window = int(now // window_seconds)
+        self._calls += 1
+        if self._calls % self.GC_EVERY == 0:
+            self._evict_stale(now)
+
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = self._buckets[route] = {}
+
+        current = previous = 0
+        entry = bucket.get(client)
+        if entry is not None:
+            if entry[0] == window:
+                current, previous = entry[1], entry[2]
+            elif entry[0] == window - 1:
+                previous = entry[1]
+
+        elapsed_fraction = (now % window_seconds) / window_seconds
+        if previous * (1 - elapsed_fraction) + current >= limit:
             raise HTTPException(status_code=429, detail="Too many requests.")
-        timestamps.append(now)
-        self._requests[key] = timestamps
+        bucket[client] = (window, current + 1, previous, window_seconds)
+
+    def _evict_stale(self, now: float) -> None:
+        # An entry stops mattering once its window is two or more windows old.
+        for bucket in self._buckets.values():
+            stale = [
+                client
+                for client, (window, _, _, window_seconds) in bucket.items()
+                if window < int(now // window_seconds) - 1
+            ]
+            for client in stale:
+                del bucket[client]
 
 
 rate_limiter = RateLimiter()
 
 
-def _client_key(request: Request, suffix: str) -> str:
-    host = request.client.host if request.client else "unknown"
-    return f"{host}:{suffix}"
+class TokenBucket:
+    """Proactive limiter that keeps outbound calls under a provider's per-minute quota."""
+
+    def __init__(self, rate_per_minute: float, capacity: int) -> None:
+        self._rate = rate_per_minute / 60.0
+        self._capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+# Stay at 80% of the documented Gemini RPM so bursts are smoothed before they 429.
+GEMINI_RPM_LIMIT = int(os.getenv("GEMINI_RPM_LIMIT", "1000"))
+GEMINI_MAX_ATTEMPTS = 5
+GEMINI_BACKOFF_MAX_SECONDS = 30
+GEMINI_RETRY_STATUSES = {429, 500, 502, 503, 504}
+gemini_bucket = TokenBucket(
+    rate_per_minute=GEMINI_RPM_LIMIT * 0.8,
+    capacity=max(1, GEMINI_RPM_LIMIT // 60),
+)
+
+# Cap in-flight Gemini calls per process; callers that cannot get a slot in time
+# get a fast 503 instead of piling up on the connection pool.
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+GEMINI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GEMINI_QUEUE_TIMEOUT_SECONDS", "5"))
+gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+
+@asynccontextmanager
+async def _gemini_slot():
+    try:
+        await asyncio.wait_for(gemini_semaphore.acquire(), GEMINI_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service is busy. Please try again.",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        yield
+    finally:
+        gemini_semaphore.release()
+
+
+def _client_host(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
 
 
 def _is_https_request(request: Request) -> bool:
     forwarded = request.headers.get("x-forwarded-proto")
     if forwarded:
         return forwarded == "https"
-    return request.url.scheme == "https"
+    return request.scope["scheme"] == "https"
 
 
 def _require_https(request: Request) -> None:
@@ -118,25 +323,30 @@ def _require_https(request: Request) -> None:
         raise HTTPException(status_code=400, detail="HTTPS is required.")
 
 
-def _cors_origins() -> list[str]:
-    raw = os.getenv("CORS_ALLOWED_ORIGINS", "")
-    origins = [o.strip() for o in raw.split(",") if o.strip()]
+_DEV_ORIGINS = (
+    "http://localhost:19006",
+    "http://127.0.0.1:19006",
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "http://localhost:8081",
+    "http://127.0.0.1:8081",
+    "http://localhost:8082",
+    "http://127.0.0.1:8082",
+)
+
+
+def _cors_origins() -> tuple[str, ...]:
+    seen: set[str] = set()
+    origins: list[str] = []
+    candidates = os.getenv("CORS_ALLOWED_ORIGINS", "").split(",")
     if not IS_PRODUCTION:
-        origins.extend(
-            [
-                "http://localhost:19006",
-                "http://127.0.0.1:19006",
-                "http://localhost:3000",
-                "http://127.0.0.1:3000",
-                "http://localhost:8081",
-                "http://127.0.0.1:8081",
-                "http://localhost:8082",
-                "http://127.0.0.1:8082",
-                "http://localhost:8082",
-                "http://127.0.0.1:8082",
-            ]
-        )
-    return list(dict.fromkeys(origins))
+        candidates.extend(_DEV_ORIGINS)
+    for origin in candidates:
+        origin = origin.strip()
+        if origin and origin not in seen:
+            seen.add(origin)
+            origins.append(origin)
+    return tuple(origins)
 
 
 allowed_origins = _cors_origins()
@@ -149,44 +359,90 @@ if allowed_origins:
         allow_headers=["Authorization", "Content-Type", "Accept", "X-Client-Type"],
     )
 
-DOC_PATHS = {"/docs", "/openapi.json", "/redoc"}
+DOC_PATHS = frozenset({"/docs", "/openapi.json", "/redoc"})
+
+_SECURITY_HEADERS = [
+    (b"strict-transport-security", b"max-age=63072000; includeSubDomains; preload"),
+    (b"x-content-type-options", b"nosniff"),
+    (b"referrer-policy", b"no-referrer"),
+    (b"permissions-policy", b"geolocation=(), microphone=()"),
+    (b"x-frame-options", b"DENY"),
+]
+# Docs pages need Swagger UI assets plus the inline script/styles it uses.
+_DOCS_CSP_HEADER = (
+    b"content-security-policy",
+    b"default-src 'self' https:; "
+    b"img-src 'self' https: data:; "
+    b"style-src 'self' https: 'unsafe-inline'; "
+    b"script-src 'self' https: 'unsafe-inline'; "
+    b"connect-src 'self' http: https: ws:; "
+    b"frame-ancestors 'none';",
+)
+# Strict by default for API responses.
+_API_CSP_HEADER = (b"content-security-policy", b"default-src 'none'; frame-ancestors 'none';")
 
-@app.middleware("http")
-async def security_headers(request: Request, call_next):
-    _require_https(request)
 
-    response = await call_next(request)
-
-    response.headers["Strict-Transport-Security"] = "max-age=63072000; includeSubDomains; preload"
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["Referrer-Policy"] = "no-referrer"
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=()"
-    response.headers["X-Frame-Options"] = "DENY"
-
-    if request.url.path in DOC_PATHS:
-        # allow Swagger UI assets + inline script/styles used by docs page
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self' https:; "
-            "img-src 'self' https: data:; "
-            "style-src 'self' https: 'unsafe-inline'; "
-            "script-src 'self' https: 'unsafe-inline'; "
-            "connect-src 'self' http: https: ws:; "
-            "frame-ancestors 'none';"
-        )
-    else:
-        # strict by default for your API responses
-        response.headers["Content-Security-Policy"] = "default-src 'none'; frame-ancestors 'none';"
+class SecurityHeadersMiddleware:
+    """Enforce HTTPS in production and append the static security headers to every response."""
 
-    return response
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if IS_PRODUCTION and not _is_https_request(Request(scope)):
+            response = JSONResponse(status_code=400, content={"detail": "HTTPS is required."})
+            await response(scope, receive, send)
+            return
 
+        extra_headers = [
+            *_SECURITY_HEADERS,
+            _DOCS_CSP_HEADER if scope["path"] in DOC_PATHS else _API_CSP_HEADER,
+        ]
 
-@app.middleware("http")
-async def body_limit_middleware(request: Request, call_next):
-    if request.url.path in {"/v1/speech/turn", "/speech_turn"}:
-        content_length = request.headers.get("content-length")
-        if content_length and int(content_length) > MAX_AUDIO_BYTES:
-            return JSONResponse(status_code=413, content={"detail": "Audio upload too large."})
-    return await call_next(request)
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+app.add_middleware(SecurityHeadersMiddleware)
+
+
+BODY_LIMIT_PATHS = frozenset(
+    {"/v1/speech/turn", "/v1/speech/turn/stream", "/v1/smoke/login-and-turn", "/speech_turn"}
+)
+
+
+class BodyLimitMiddleware:
+    """Reject oversized speech uploads from the Content-Length header before the body is read.
+
+    Plain ASGI rather than @app.middleware("http") so every other route passes
+    straight through without a Request wrapper or an extra task.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in BODY_LIMIT_PATHS:
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if int(value) > MAX_AUDIO_BYTES:
+                        response = JSONResponse(
+                            status_code=413, content={"detail": "Audio upload too large."}
+                        )
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(BodyLimitMiddleware)
 
 
 class ChatRequest(BaseModel):
@@ -223,10 +479,58 @@ class LLMChatRequest(BaseModel):
     messages: list[ChatMessage]
 
 
+CHAT_ROLES = frozenset({"user", "assistant"})
+CHAT_SPEAKERS = frozenset({"english", "chinese"})
+
+# The hot chat routes take a raw body and check it by hand; keep the documented schema.
+LLM_CHAT_OPENAPI_EXTRA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"$ref": "#/components/schemas/LLMChatRequest"}
+            }
+        },
+    }
+}
+
+
+def _parse_llm_chat_payload(body: dict[str, Any]) -> LLMChatRequest:
+    """Check the only invariants /api/chat relies on, then build the model without validation."""
+    # Check the type first: a list or dict is valid JSON but unhashable for `in`.
+    speaker = body.get("speaker")
+    if not isinstance(speaker, str) or speaker not in CHAT_SPEAKERS:
+        raise HTTPException(status_code=422, detail="speaker must be 'english' or 'chinese'.")
+    raw_messages = body.get("messages")
+    if not isinstance(raw_messages, list) or not raw_messages:
+        raise HTTPException(status_code=422, detail="messages must be a non-empty list.")
+    messages = []
+    for message in raw_messages:
+        role = message.get("role") if isinstance(message, dict) else None
+        if not isinstance(role, str) or role not in CHAT_ROLES:
+            raise HTTPException(status_code=422, detail="message role must be 'user' or 'assistant'.")
+        content = message.get("content")
+        if not isinstance(content, str) or not content:
+            raise HTTPException(status_code=422, detail="message content must be a non-empty string.")
+        messages.append(ChatMessage.model_construct(role=role, content=content))
+    return LLMChatRequest.model_construct(speaker=speaker, messages=messages)
+
+
 class LLMChatResponse(BaseModel):
     reply: str
 
 
+class LLMChatBatchRequest(BaseModel):
+    requests: list[LLMChatRequest] = Field(..., min_length=1, max_length=100)
+
+
+class LLMChatBatchJobResponse(BaseModel):
+    job_id: str
+    status: Literal["pending", "ready", "error"]
+    replies: list[str | None] | None = None
+    error: str | None = None
+
+
 class SpeechAudioJobResponse(BaseModel):
     status: Literal["pending", "ready", "error"]
     audio_url: str | None = None
@@ -235,6 +539,12 @@ class SpeechAudioJobResponse(BaseModel):
     tts_error: str | None = None
 
 
+def _model_response(model: BaseModel) -> Response:
+    # The model was validated when it was built; serialize it once in pydantic-core
+    # instead of letting FastAPI dump, re-validate and re-encode it via response_model.
+    return Response(model.model_dump_json(), media_type="application/json")
+
+
 class LoginRequest(BaseModel):
     username: str = Field(..., min_length=3, max_length=200)
     password: str = Field(..., min_length=8, max_length=200)
@@ -247,7 +557,7 @@ class LoginResponse(BaseModel):
     refresh_token: str | None = None
 
 
-def _set_refresh_cookie(response: JSONResponse, token: str | None) -> None:
+def _set_refresh_cookie(response: Response, token: str | None) -> None:
     if token is None:
         response.delete_cookie(COOKIE_NAME, path="/")
         return
@@ -262,59 +572,51 @@ def _set_refresh_cookie(response: JSONResponse, token: str | None) -> None:
     )
 
 
+def _is_web_client(request: Request) -> bool:
+    return request.headers.get("x-client-type", "mobile") == "web"
+
+
+def _login_payload(request: Request, tokens: dict[str, Any]) -> LoginResponse:
+    # Web clients get the refresh token as an HttpOnly cookie; everyone else in the body.
+    return LoginResponse(
+        access_token=tokens["access_token"],
+        expires_in=tokens["access_expires_in"],
+        refresh_token=None if _is_web_client(request) else tokens["refresh_token"],
+    )
+
+
+def _token_response(request: Request, tokens: dict[str, Any]) -> JSONResponse:
+    is_web = _is_web_client(request)
+    response_payload = _login_payload(request, tokens)
+    response = JSONResponse(content=response_payload.model_dump())
+    if is_web:
+        _set_refresh_cookie(response, tokens["refresh_token"])
+    return response
+
+
 @app.post("/auth/login", response_model=LoginResponse)
 async def login(request: Request, payload: LoginRequest) -> LoginResponse:
-    rate_limiter.check(_client_key(request, "login"), limit=5, window_seconds=60)
+    rate_limiter.check("login", _client_host(request), limit=5, window_seconds=60)
     _require_https(request)
     if not verify_password(payload.username, payload.password):
         raise HTTPException(status_code=401, detail="Invalid credentials.")
     roles = get_default_roles(payload.username)
     scopes = ["chat:write", "speech:write"]
     tokens = issue_tokens(payload.username, roles=roles, scopes=scopes)
-    expires_in = int(
-        (tokens["access_expires_at"] - datetime.now(timezone.utc)).total_seconds()
-    )
-    response_payload = LoginResponse(
-        access_token=tokens["access_token"],
-        expires_in=max(expires_in, 0),
-        refresh_token=None,
-    )
-    response = JSONResponse(content=response_payload.model_dump())
-    client_type = request.headers.get("x-client-type", "mobile")
-    if client_type == "web":
-        _set_refresh_cookie(response, tokens["refresh_token"])
-    else:
-        response_payload.refresh_token = tokens["refresh_token"]
-        response = JSONResponse(content=response_payload.model_dump())
-    return response
+    return _token_response(request, tokens)
 
 
 @app.post("/auth/refresh", response_model=LoginResponse)
 async def refresh(
     request: Request, refresh_token: str | None = Body(default=None, embed=True)
 ) -> LoginResponse:
-    rate_limiter.check(_client_key(request, "refresh"), limit=10, window_seconds=60)
+    rate_limiter.check("refresh", _client_host(request), limit=10, window_seconds=60)
     _require_https(request)
     token = refresh_token or request.cookies.get(COOKIE_NAME)
     if not token:
         raise HTTPException(status_code=401, detail="Missing refresh token.")
     tokens = rotate_refresh_token(token)
-    expires_in = int(
-        (tokens["access_expires_at"] - datetime.now(timezone.utc)).total_seconds()
-    )
-    response_payload = LoginResponse(
-        access_token=tokens["access_token"],
-        expires_in=max(expires_in, 0),
-        refresh_token=None,
-    )
-    response = JSONResponse(content=response_payload.model_dump())
-    client_type = request.headers.get("x-client-type", "mobile")
-    if client_type == "web":
-        _set_refresh_cookie(response, tokens["refresh_token"])
-    else:
-        response_payload.refresh_token = tokens["refresh_token"]
-        response = JSONResponse(content=response_payload.model_dump())
-    return response
+    return _token_response(request, tokens)
 
 
 @app.post("/auth/logout")
@@ -335,8 +637,14 @@ async def health(_: AuthContext = Depends(get_auth_context)) -> dict[str, bool]:
     return {"ok": True}
 
 
+def _write_audio_file(file_path: str, audio_bytes: bytes) -> None:
+    with open(file_path, "wb") as audio_file:
+        audio_file.write(audio_bytes)
+
+
 @app.get("/debug/tts")
 async def debug_tts(
+    request: Request,
     text: str = "你好",
     target_lang: str = "zh",
     _: AuthContext = Depends(require_roles("admin")),
@@ -347,22 +655,24 @@ async def debug_tts(
     - Saves an audio asset under AUDIO_DIR
     - Returns a URL under /static/audio that should be playable
     """
-    api_key = os.getenv("ELEVENLABS_API_KEY")
+    api_key = ELEVENLABS_API_KEY
     if not api_key:
         raise HTTPException(status_code=503, detail="ElevenLabs API key not configured.")
 
-    tts_client = ElevenLabsTTSClient(api_key=api_key)
+    global _debug_tts_client
+    if _debug_tts_client is None:
+        _debug_tts_client = ElevenLabsTTSClient(api_key=api_key, client=request.app.state.http)
 
     try:
-        audio_bytes, meta = await tts_client.synthesize(text, target_lang)
+        audio_bytes, meta = await _debug_tts_client.synthesize(text, target_lang)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=502, detail=f"TTS failed: {type(exc).__name__}: {exc}")
 
+    audio_bytes, meta = _wrap_pcm_as_wav(audio_bytes, meta)
     extension = str(meta.get("file_extension", "mp3"))
-    filename = f"{uuid4().hex}.{extension}"
+    filename = f"{secrets.token_hex(16)}.{extension}"
     file_path = os.path.join(AUDIO_DIR, filename)
-    with open(file_path, "wb") as audio_file:
-        audio_file.write(audio_bytes)
+    await asyncio.to_thread(_write_audio_file, file_path, audio_bytes)
 
     return {
         "text": text,
@@ -370,6 +680,17 @@ async def debug_tts(
     }
 
 
+class AudioFileResponse(FileResponse):
+    # Neither Starlette nor uvicorn offers sendfile, so the clip is read through a worker
+    # thread per chunk; 1 MiB chunks serve a typical clip in one hop instead of ~8.
+    chunk_size = 1024 * 1024
+
+
+# A clip never changes under its URL and the URL's token expires anyway, so let the
+# browser replay it from cache instead of fetching it again.
+AUDIO_CACHE_CONTROL = f"private, max-age={AUDIO_TOKEN_TTL_MINUTES * 60}, immutable"
+
+
 @app.get("/static/audio/{filename}")
 async def audio_file(filename: str, token: str) -> FileResponse:
     verify_audio_token(token, filename)
@@ -377,24 +698,29 @@ async def audio_file(filename: str, token: str) -> FileResponse:
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Audio not found.")
     media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
-    return FileResponse(file_path, media_type=media_type)
+    return AudioFileResponse(
+        file_path,
+        media_type=media_type,
+        headers={"Cache-Control": AUDIO_CACHE_CONTROL},
+    )
 
 
-def get_speech_turn_service() -> SpeechTurnService:
+def get_speech_turn_service(request: Request) -> SpeechTurnService:
     global _speech_service
     if _speech_service is not None:
         return _speech_service
 
-    gemini_api_key = os.getenv("GEMINI_API_KEY")
+    gemini_api_key = GEMINI_API_KEY
     if not gemini_api_key:
         raise HTTPException(status_code=503, detail="Gemini API key not configured.")
-    elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
+    elevenlabs_api_key = ELEVENLABS_API_KEY
     if not elevenlabs_api_key:
         raise HTTPException(status_code=503, detail="ElevenLabs API key not configured.")
 
-    stt_client = GeminiSTTClient(api_key=gemini_api_key)
-    tts_client = ElevenLabsTTSClient(api_key=elevenlabs_api_key)
-    text_client = GeminiSpeechTurnTextClient(api_key=gemini_api_key)
+    http_client = request.app.state.http
+    stt_client = GeminiSTTClient(api_key=gemini_api_key, client=http_client)
+    tts_client = ElevenLabsTTSClient(api_key=elevenlabs_api_key, client=http_client)
+    text_client = GeminiSpeechTurnTextClient(api_key=gemini_api_key, client=http_client)
 
     _speech_service = SpeechTurnService(
         stt_client=stt_client,
@@ -405,99 +731,145 @@ def get_speech_turn_service() -> SpeechTurnService:
     return _speech_service
 
 
+@app.get("/v1/models/warm")
+async def warm_models(
+    request: Request,
+    service: SpeechTurnService = Depends(get_speech_turn_service),
+    _: AuthContext = Depends(require_scopes("speech:write")),
+) -> dict[str, bool]:
+    """Build the speech service and open the pooled upstream connection ahead of a turn."""
+    rate_limiter.check("warm", _client_host(request), limit=10, window_seconds=60)
+    await gemini_bucket.acquire()
+    try:
+        # Any response will do; the point is the TLS session left in the shared pool.
+        await request.app.state.http.head(GEMINI_API_BASE, timeout=5.0)
+    except httpx.HTTPError as exc:
+        logger.info("Upstream warm-up failed: %s", type(exc).__name__)
+        return {"ok": False}
+    return {"ok": True}
+
+
+CJK_REGEX = re.compile(r"[\u4e00-\u9fff]")
+
+
 def _contains_chinese(text: str) -> bool:
-    return any("\u4e00" <= char <= "\u9fff" for char in text)
+    return CJK_REGEX.search(text) is not None
 
 
-def _simplify_topic(text: str) -> str:
-    words = [word.strip(".,!? ") for word in text.split() if word.strip(".,!? ")]
-    if not words:
-        return "日常生活"
-    return words[0].lower()
+# First whitespace-separated word with leading/trailing ".,!?" trimmed.
+_TOPIC_SEARCH = re.compile(r"[^\s.,!?](?:\S*[^\s.,!?])?").search
 
 
-def _build_beginner_response(message: str) -> ChatResponse:
+def _simplify_topic(text: str) -> str:
+    match = _TOPIC_SEARCH(text)
+    return match.group(0).lower() if match else "日常生活"
+
+
+# Static teaching scaffolding for /chat; only the topic is interpolated per request.
+# Responses are built as plain dicts in the ChatResponse shape and serialized
+# directly, so no model instances are created per request.
+_BEGINNER_KEY_POINTS = [
+    {"phrase": "你好", "pinyin": "Nǐ hǎo", "meaning": "Hello"},
+    {"phrase": "我们可以", "pinyin": "Wǒmen kěyǐ", "meaning": "We can"},
+    {"phrase": "怎么样", "pinyin": "Zěnme yàng", "meaning": "How (is it)"},
+]
+_BEGINNER_ALTERNATIVES = ["我们聊点别的吧。", "你想聊什么？"]
+_BEGINNER_FOLLOW_UP = "用中文回答：你今天感觉如何？"
+
+_INTERMEDIATE_KEY_POINTS = [
+    {"phrase": "明白了", "pinyin": "Míngbai le", "meaning": "Got it"},
+    {"phrase": "深入", "pinyin": "Shēnrù", "meaning": "In depth"},
+    {"phrase": "感兴趣", "pinyin": "Gǎn xìngqù", "meaning": "Interested"},
+]
+_INTERMEDIATE_ALTERNATIVES = ["我们换个话题吧。", "你想先从哪里开始？"]
+_INTERMEDIATE_FOLLOW_UP = "试着用中文描述你最感兴趣的一点。"
+
+# Softened phrasing when the learner already writes some Chinese.
+WOMEN_KEYI = "我们可以"
+WOMEN_YE_KEYI = "我们也可以"
+
+
+def _build_beginner_response(message: str) -> dict[str, Any]:
     topic = _simplify_topic(message)
     reply = f"你好！我们可以聊聊{topic}。你今天怎么样？"
-    teaching = Teaching(
-        translation=f"Hi! We can talk about {topic}. How are you today?",
-        pinyin="Nǐ hǎo! Wǒmen kěyǐ liáo liáo " + f"{topic}。 Nǐ jīntiān zěnme yàng?",
-        key_points=[
-            KeyPoint(phrase="你好", pinyin="Nǐ hǎo", meaning="Hello"),
-            KeyPoint(phrase="我们可以", pinyin="Wǒmen kěyǐ", meaning="We can"),
-            KeyPoint(phrase="怎么样", pinyin="Zěnme yàng", meaning="How (is it)"),
-        ],
-        alternatives=["我们聊点别的吧。", "你想聊什么？"],
-        follow_up="用中文回答：你今天感觉如何？",
-    )
-    return ChatResponse(reply=reply, teaching=teaching)
+    teaching = {
+        "translation": f"Hi! We can talk about {topic}. How are you today?",
+        "pinyin": "Nǐ hǎo! Wǒmen kěyǐ liáo liáo " + f"{topic}。 Nǐ jīntiān zěnme yàng?",
+        "key_points": _BEGINNER_KEY_POINTS,
+        "alternatives": _BEGINNER_ALTERNATIVES,
+        "follow_up": _BEGINNER_FOLLOW_UP,
+    }
+    return {"reply": reply, "teaching": teaching}
 
 
-def _build_intermediate_response(message: str) -> ChatResponse:
+def _build_intermediate_response(message: str) -> dict[str, Any]:
     topic = _simplify_topic(message)
     reply = f"明白了。我们可以深入聊聊{topic}，你最感兴趣的部分是什么？"
-    teaching = Teaching(
-        translation=(
+    teaching = {
+        "translation": (
             "Got it. We can talk more in depth about "
             f"{topic}. Which part interests you most?"
         ),
-        pinyin=(
+        "pinyin": (
             "Míngbai le. Wǒmen kěyǐ shēnrù liáo liáo "
             f"{topic}，nǐ zuì gǎn xìngqù de bùfen shì shénme?"
         ),
-        key_points=[
-            KeyPoint(phrase="明白了", pinyin="Míngbai le", meaning="Got it"),
-            KeyPoint(phrase="深入", pinyin="Shēnrù", meaning="In depth"),
-            KeyPoint(phrase="感兴趣", pinyin="Gǎn xìngqù", meaning="Interested"),
-        ],
-        alternatives=["我们换个话题吧。", "你想先从哪里开始？"],
-        follow_up="试着用中文描述你最感兴趣的一点。",
-    )
-    return ChatResponse(reply=reply, teaching=teaching)
+        "key_points": _INTERMEDIATE_KEY_POINTS,
+        "alternatives": _INTERMEDIATE_ALTERNATIVES,
+        "follow_up": _INTERMEDIATE_FOLLOW_UP,
+    }
+    return {"reply": reply, "teaching": teaching}
+
+
+_ENGLISH_SPEAKER_PROMPT = (
+    "You are a Chinese language tutor. Only help with Chinese ↔ English learning: "
+    "translation, vocabulary, grammar, pronunciation (pinyin), and usage examples. "
+    "If the user asks about unrelated topics (politics, health, coding, math, etc.), "
+    "politely refuse and redirect them to a language-learning alternative. "
+    "Keep replies concise, conversational, and tutor-like. "
+    "Always include the actual learning output, never vague placeholders. "
+    "Never reply with only meta teaching text without the answer itself. "
+    "Use Simplified Chinese only. "
+    "If the user provides an English phrase or sentence, treat it as a direct translation request and translate it immediately. "
+    "Do NOT ask the user to provide an English sentence if one is already present. "
+    "IMPORTANT: If the user asks to learn MULTIPLE words or items (e.g., '1, 2, 3' or 'colors' or 'days of the week'), "
+    "you MUST output ALL of the requested items — never just one. "
+    "Output each item as a separate block in this exact format, separated by ---:\n"
+    "Chinese: <hanzi>\n"
+    "Pinyin: <tone-marked pinyin, e.g. nǐ hǎo>\n"
+    "Meaning: <plain English meaning>\n"
+    "Notes: <optional one-line tip>\n"
+    "---\n"
+    "(Omit --- after the last item. Omit Notes if not helpful.)\n"
+    "For a single item, use the same format without ---.\n"
+    "End most responses with a short nudge (e.g., 'Want to practice?', 'Want the next one?', 'Want an example sentence?')."
+)
 
+_CHINESE_SPEAKER_PROMPT = (
+    "你是一位英语导师，专门帮助中文母语者学习英语词汇和短语。"
+    "只处理英文↔中文学习相关问题。其他无关话题礼貌拒绝并引导回语言学习。"
+    "回复要简洁、对话式、像导师一样。"
+    "重要规则：当用户要求学习多个词语或数字（如：一、二、三 或 1、2、3），"
+    "必须列出用户要求的每一个词，用 --- 分隔每个词条，绝对不能只给一个。"
+    "每个词条使用以下固定格式，每行一个字段：\n"
+    "Chinese: <英语单词，例如：one>\n"
+    "Pinyin: <简单发音提示，例如：wun>\n"
+    "Meaning: <中文含义，例如：一>\n"
+    "---\n"
+    "（最后一个词条不需要 ---）\n"
+    "Chinese 字段写英语单词，Meaning 字段写中文含义，Pinyin 字段写简单发音提示帮助中文母语者记忆。\n"
+    "不要做单词拆解，不要长篇解释，除非用户要求。\n"
+    "大多数回复以简短引导结尾（如：要例句吗？要练习发音吗？继续下一个吗？）。"
+)
 
-def _build_system_prompt(speaker: Literal["english", "chinese"]) -> str:
-    if speaker == "english":
-        return (
-            "You are a Chinese language tutor. Only help with Chinese ↔ English learning: "
-            "translation, vocabulary, grammar, pronunciation (pinyin), and usage examples. "
-            "If the user asks about unrelated topics (politics, health, coding, math, etc.), "
-            "politely refuse and redirect them to a language-learning alternative. "
-            "Keep replies concise, conversational, and tutor-like. "
-            "Always include the actual learning output, never vague placeholders. "
-            "Never reply with only meta teaching text without the answer itself. "
-            "Use Simplified Chinese only. "
-            "If the user provides an English phrase or sentence, treat it as a direct translation request and translate it immediately. "
-            "Do NOT ask the user to provide an English sentence if one is already present. "
-            "IMPORTANT: If the user asks to learn MULTIPLE words or items (e.g., '1, 2, 3' or 'colors' or 'days of the week'), "
-            "you MUST output ALL of the requested items — never just one. "
-            "Output each item as a separate block in this exact format, separated by ---:\n"
-            "Chinese: <hanzi>\n"
-            "Pinyin: <tone-marked pinyin, e.g. nǐ hǎo>\n"
-            "Meaning: <plain English meaning>\n"
-            "Notes: <optional one-line tip>\n"
-            "---\n"
-            "(Omit --- after the last item. Omit Notes if not helpful.)\n"
-            "For a single item, use the same format without ---.\n"
-            "End most responses with a short nudge (e.g., 'Want to practice?', 'Want the next one?', 'Want an example sentence?')."
-        )
+_SYSTEM_PROMPTS: Final[dict[str, str]] = {
+    "english": _ENGLISH_SPEAKER_PROMPT,
+    "chinese": _CHINESE_SPEAKER_PROMPT,
+}
 
-    return (
-        "你是一位英语导师，专门帮助中文母语者学习英语词汇和短语。"
-        "只处理英文↔中文学习相关问题。其他无关话题礼貌拒绝并引导回语言学习。"
-        "回复要简洁、对话式、像导师一样。"
-        "重要规则：当用户要求学习多个词语或数字（如：一、二、三 或 1、2、3），"
-        "必须列出用户要求的每一个词，用 --- 分隔每个词条，绝对不能只给一个。"
-        "每个词条使用以下固定格式，每行一个字段：\n"
-        "Chinese: <英语单词，例如：one>\n"
-        "Pinyin: <简单发音提示，例如：wun>\n"
-        "Meaning: <中文含义，例如：一>\n"
-        "---\n"
-        "（最后一个词条不需要 ---）\n"
-        "Chinese 字段写英语单词，Meaning 字段写中文含义，Pinyin 字段写简单发音提示帮助中文母语者记忆。\n"
-        "不要做单词拆解，不要长篇解释，除非用户要求。\n"
-        "大多数回复以简短引导结尾（如：要例句吗？要练习发音吗？继续下一个吗？）。"
-    )
+
+def _build_system_prompt(speaker: Literal["english", "chinese"]) -> str:
+    return _SYSTEM_PROMPTS[speaker]
 
 
 HAN_REGEX = re.compile(r"[\u3400-\u9FFF]")
@@ -548,31 +920,83 @@ def _normalize_structured_reply(text: str) -> str:
     return "\n---\n".join(normalized) if normalized else text
 
 
+chat_reply_cache: TTLCache[str] = TTLCache(
+    maxsize=int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=int(os.getenv("CHAT_CACHE_TTL_SECONDS", "3600")),
+)
+
+
+def _chat_cache_key(request: LLMChatRequest) -> str:
+    # Key on the whole conversation: the same last message can need a different reply in context.
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(request.speaker.encode())
+    for message in request.messages:
+        digest.update(b"\x1e")
+        digest.update(message.role.encode())
+        digest.update(b"\x1f")
+        digest.update(message.content.strip().encode())
+    return digest.hexdigest()
+
+
+_GEMINI_ROLES = {"assistant": "model", "user": "user"}
+_message_fields = operator.attrgetter("role", "content")
+
+
+def _build_chat_payload(request: LLMChatRequest) -> dict:
+    system_prompt = _build_system_prompt(request.speaker)
+    roles = _GEMINI_ROLES
+    return {
+        "systemInstruction": {"parts": [{"text": system_prompt}]},
+        "generationConfig": {"maxOutputTokens": 600},
+        "contents": [
+            {"role": roles[role], "parts": [{"text": content}]}
+            for role, content in map(_message_fields, request.messages)
+        ],
+    }
+
+
+def _extract_stream_text(data: dict) -> str:
+    parts = (
+        (data.get("candidates") or [{}])[0]
+        .get("content", {})
+        .get("parts", [])
+    )
+    return "".join(
+        p.get("text", "") for p in parts if not p.get("thought") and p.get("text")
+    )
+
+
 async def _generate_chat_reply(
     client: httpx.AsyncClient, api_key: str, payload: dict
 ) -> str:
-    endpoint_path = "/v1beta/models/gemini-2.5-flash:generateContent"
-    backoff_seconds = [2, 4, 6]
+    params = {"key": api_key}
     response: httpx.Response | None = None
-    for attempt in range(len(backoff_seconds) + 1):
-        logger.info("Calling Gemini endpoint: %s", endpoint_path)
+    for attempt in range(GEMINI_MAX_ATTEMPTS):
+        await gemini_bucket.acquire()
+        logger.info("Calling Gemini endpoint: %s", GEMINI_GENERATE_URL)
         logger.info("Gemini payload preview: %s", str(payload)[:300])
-        response = await client.post(
-            f"https://generativelanguage.googleapis.com{endpoint_path}",
-            headers={
-                "Content-Type": "application/json",
-            },
-            params={"key": api_key},
-            json=payload,
-        )
+        async with _gemini_slot():
+            response = await client.post(
+                GEMINI_GENERATE_URL,
+                headers=GEMINI_JSON_HEADERS,
+                params=params,
+                json=payload,
+            )
         logger.info("Gemini response status_code=%s", response.status_code)
         logger.info("Gemini raw response preview: %s", response.text[:500])
-        if response.status_code == 429 and attempt < len(backoff_seconds):
-            wait_seconds = backoff_seconds[attempt]
+        if (
+            response.status_code in GEMINI_RETRY_STATUSES
+            and attempt < GEMINI_MAX_ATTEMPTS - 1
+        ):
+            # Full-jitter exponential backoff so concurrent retries spread out.
+            wait_seconds = random.uniform(
+                0, min(GEMINI_BACKOFF_MAX_SECONDS, 2 ** (attempt + 1))
+            )
             logger.warning(
-                "Gemini returned 429 (attempt %s/%s); retrying in %ss",
+                "Gemini returned %s (attempt %s/%s); retrying in %.1fs",
+                response.status_code,
                 attempt + 1,
-                len(backoff_seconds) + 1,
+                GEMINI_MAX_ATTEMPTS,
                 wait_seconds,
             )
             await asyncio.sleep(wait_seconds)
@@ -583,13 +1007,10 @@ async def _generate_chat_reply(
     if response is None:
         raise HTTPException(status_code=502, detail="Gemini returned no response.")
 
-    data = response.json()
-    content = (
-        data.get("candidates", [{}])[0]
-        .get("content", {})
-        .get("parts", [{}])[0]
-        .get("text")
-    )
+    try:
+        content = orjson.loads(response.content)["candidates"][0]["content"]["parts"][0]["text"]
+    except (orjson.JSONDecodeError, KeyError, IndexError, TypeError):
+        content = None
     if not content:
         raise HTTPException(status_code=502, detail="Gemini returned no content.")
     return content
@@ -598,38 +1019,42 @@ async def _generate_chat_reply(
 @app.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest, _: AuthContext = Depends(require_scopes("chat:write"))
-) -> ChatResponse:
+) -> ORJSONResponse:
     message = request.message.strip()
     if request.level == "intermediate":
         response = _build_intermediate_response(message)
     else:
         response = _build_beginner_response(message)
 
-    if _contains_chinese(message):
-        response.reply = response.reply.replace("我们可以", "我们也可以")
-    return response
+    if _contains_chinese(message) and WOMEN_KEYI in response["reply"]:
+        response["reply"] = response["reply"].replace(WOMEN_KEYI, WOMEN_YE_KEYI, 1)
+    # Returning the response directly skips re-validating it against ChatResponse,
+    # which is still declared above for the OpenAPI schema.
+    return ORJSONResponse(response)
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http
 
 
-@app.post("/api/chat", response_model=LLMChatResponse)
+@app.post("/api/chat", response_model=LLMChatResponse, openapi_extra=LLM_CHAT_OPENAPI_EXTRA)
 async def llm_chat(
-    request: LLMChatRequest, _: AuthContext = Depends(require_scopes("chat:write"))
-) -> LLMChatResponse:
-    api_key = os.getenv("GEMINI_API_KEY")
+    body: dict[str, Any] = Body(...),
+    client: httpx.AsyncClient = Depends(get_http_client),
+    _: AuthContext = Depends(require_scopes("chat:write")),
+) -> Response:
+    request = _parse_llm_chat_payload(body)
+    api_key = GEMINI_API_KEY
     if not api_key:
         raise HTTPException(status_code=503, detail="Gemini API key not configured.")
 
-    system_prompt = _build_system_prompt(request.speaker)
-    payload = {
-        "systemInstruction": {"parts": [{"text": system_prompt}]},
-        "generationConfig": {"maxOutputTokens": 600},
-        "contents": [
-            {
-                "role": "model" if message.role == "assistant" else "user",
-                "parts": [{"text": message.content}],
-            }
-            for message in request.messages
-        ],
-    }
+    cache_key = _chat_cache_key(request)
+    cached_reply = chat_reply_cache.get(cache_key)
+    if cached_reply is not None:
+        logger.info("LLM chat cache hit: speaker=%s", request.speaker)
+        return _model_response(LLMChatResponse(reply=cached_reply))
+
+    payload = _build_chat_payload(request)
 
     last_user_message = next(
         (message.content for message in reversed(request.messages) if message.role == "user"),
@@ -643,57 +1068,61 @@ async def llm_chat(
         last_user_message,
     )
 
+    cacheable = True
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            logger.info("About to send primary Gemini call")
-            content = await _generate_chat_reply(client=client, api_key=api_key, payload=payload)
-            logger.info("Primary Gemini response preview: %s", content[:300])
-
-            if not _is_structured_beginner_reply(content, request.speaker):
-                logger.warning("Primary Gemini response is not structured beginner format.")
-                if request.speaker == "english":
-                    repair_instruction = (
-                        "Rewrite into strict beginner Chinese tutoring format. "
-                        "If multiple items were requested, output ALL of them separated by ---. "
-                        "For each item use exactly these lines:\n"
-                        "Chinese: <hanzi>\nPinyin: <tone-marked pinyin>\nMeaning: <English meaning>\nNotes: <optional tip>\n---\n"
-                        "(No --- after the last item.) "
-                        "If user input is an English sentence, translate it into Chinese directly. "
-                        "Rules: concrete Simplified Chinese, tone-marked pinyin, plain English meaning. No vague text."
-                    )
-                else:
-                    repair_instruction = (
-                        "按以下格式改写，教英语给中文母语者。如果用户要求多个词，必须全部列出，用 --- 分隔。"
-                        "每个词条格式：\nChinese: <英语单词>\nPinyin: <发音提示>\nMeaning: <中文含义>\n---\n"
-                        "（最后一个不需要 ---）。Chinese 字段写英语单词，Meaning 字段写中文。不要只给一个词。"
-                    )
-                repair_payload = {
-                    "systemInstruction": {
-                        "parts": [{"text": repair_instruction}]
-                    },
-                    "generationConfig": {"maxOutputTokens": 400, "temperature": 0.1},
-                    "contents": [
-                        {
-                            "role": "user",
-                            "parts": [
-                                {
-                                    "text": (
-                                        f"User question: {last_user_message}\n"
-                                        f"Draft answer to fix:\n{content}"
-                                    )
-                                }
-                            ],
-                        }
-                    ],
-                }
-                logger.warning("Triggering repair pass for non-structured response.")
-                logger.info("About to send repair Gemini call")
-                repaired = await _generate_chat_reply(
-                    client=client, api_key=api_key, payload=repair_payload
+        logger.info("About to send primary Gemini call")
+        content = await _generate_chat_reply(client=client, api_key=api_key, payload=payload)
+        logger.info("Primary Gemini response preview: %s", content[:300])
+
+        if not _is_structured_beginner_reply(content, request.speaker):
+            logger.warning("Primary Gemini response is not structured beginner format.")
+            if request.speaker == "english":
+                repair_instruction = (
+                    "Rewrite into strict beginner Chinese tutoring format. "
+                    "If multiple items were requested, output ALL of them separated by ---. "
+                    "For each item use exactly these lines:\n"
+                    "Chinese: <hanzi>\nPinyin: <tone-marked pinyin>\nMeaning: <English meaning>\nNotes: <optional tip>\n---\n"
+                    "(No --- after the last item.) "
+                    "If user input is an English sentence, translate it into Chinese directly. "
+                    "Rules: concrete Simplified Chinese, tone-marked pinyin, plain English meaning. No vague text."
+                )
+            else:
+                repair_instruction = (
+                    "按以下格式改写，教英语给中文母语者。如果用户要求多个词，必须全部列出，用 --- 分隔。"
+                    "每个词条格式：\nChinese: <英语单词>\nPinyin: <发音提示>\nMeaning: <中文含义>\n---\n"
+                    "（最后一个不需要 ---）。Chinese 字段写英语单词，Meaning 字段写中文。不要只给一个词。"
                 )
-                logger.info("Repair Gemini call completed")
-                logger.info("Repaired Gemini response preview: %s", repaired[:300])
-                content = repaired if _is_structured_beginner_reply(repaired, request.speaker) else (
+            repair_payload = {
+                "systemInstruction": {
+                    "parts": [{"text": repair_instruction}]
+                },
+                "generationConfig": {"maxOutputTokens": 400, "temperature": 0.1},
+                "contents": [
+                    {
+                        "role": "user",
+                        "parts": [
+                            {
+                                "text": (
+                                    f"User question: {last_user_message}\n"
+                                    f"Draft answer to fix:\n{content}"
+                                )
+                            }
+                        ],
+                    }
+                ],
+            }
+            logger.warning("Triggering repair pass for non-structured response.")
+            logger.info("About to send repair Gemini call")
+            repaired = await _generate_chat_reply(
+                client=client, api_key=api_key, payload=repair_payload
+            )
+            logger.info("Repair Gemini call completed")
+            logger.info("Repaired Gemini response preview: %s", repaired[:300])
+            if _is_structured_beginner_reply(repaired, request.speaker):
+                content = repaired
+            else:
+                cacheable = False
+                content = (
                     "Chinese: 请再试一次\n"
                     "Pinyin: Qǐng zài shì yī cì\n"
                     "Meaning: Something went wrong. Please try your question again."
@@ -721,7 +1150,277 @@ async def llm_chat(
 
     normalized = _normalize_structured_reply(content)
     logger.info("Normalized final response: %s", normalized)
-    return LLMChatResponse(reply=normalized)
+    if cacheable:
+        chat_reply_cache.set(cache_key, normalized)
+    return _model_response(LLMChatResponse(reply=normalized))
+
+
+@app.post("/api/chat/stream", openapi_extra=LLM_CHAT_OPENAPI_EXTRA)
+async def llm_chat_stream(
+    body: dict[str, Any] = Body(...),
+    client: httpx.AsyncClient = Depends(get_http_client),
+    _: AuthContext = Depends(require_scopes("chat:write")),
+) -> StreamingResponse:
+    """
+    Server-Sent Events variant of /api/chat:
+    - Forwards Gemini text deltas as `data: {"delta": ...}` frames
+    - Ends with `event: done`
+    - Skips the structured-format repair pass (the reply is shown as it streams)
+    """
+    request = _parse_llm_chat_payload(body)
+    api_key = GEMINI_API_KEY
+    if not api_key:
+        raise HTTPException(status_code=503, detail="Gemini API key not configured.")
+
+    payload = _build_chat_payload(request)
+    logger.info(
+        "LLM chat stream request received: speaker=%s messages=%s",
+        request.speaker,
+        len(request.messages),
+    )
+    gemini_request = client.build_request(
+        "POST",
+        GEMINI_STREAM_URL,
+        headers=GEMINI_JSON_HEADERS,
+        params={"key": api_key, "alt": "sse"},
+        json=payload,
+    )
+    # The Gemini slot is held until the stream is finished, not just until headers arrive.
+    await gemini_bucket.acquire()
+    upstream = AsyncExitStack()
+    await upstream.enter_async_context(_gemini_slot())
+    try:
+        response = await client.send(gemini_request, stream=True)
+    except httpx.RequestError as exc:
+        await upstream.aclose()
+        logger.error("Gemini stream request/network error: %s", exc)
+        raise HTTPException(status_code=502, detail=f"Gemini request error: {exc}")
+    upstream.push_async_callback(response.aclose)
+
+    if response.status_code >= 400:
+        body_preview = (await response.aread()).decode("utf-8", "replace")[:1000]
+        await upstream.aclose()
+        logger.error(
+            "Gemini stream HTTP status error: status_code=%s response_body=%s",
+            response.status_code,
+            body_preview,
+        )
+        if response.status_code == 429:
+            raise HTTPException(
+                status_code=429,
+                detail="Gemini rate limit exceeded. Please wait a few seconds and try again.",
+            )
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Gemini error: {response.status_code}: {body_preview}",
+        )
+
+    async def _events():
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    data = orjson.loads(line[5:])
+                except ValueError:
+                    logger.warning("Skipping malformed Gemini stream line: %s", line[:200])
+                    continue
+                delta = _extract_stream_text(data)
+                if delta:
+                    yield b"data: " + orjson.dumps({"delta": delta}) + b"\n\n"
+        except httpx.HTTPError as exc:
+            logger.error("Gemini stream interrupted: %s", exc)
+            yield _sse_event("error", {"detail": "Gemini stream interrupted."})
+        finally:
+            await upstream.aclose()
+        yield _sse_event("done", {})
+
+    # If the client goes away before the body is iterated, the generator's finally
+    # never runs; the background task still releases the upstream and the slot.
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        background=BackgroundTask(upstream.aclose),
+    )
+
+
+def _batch_status(state: str) -> Literal["pending", "ready", "error"]:
+    # REST reports BATCH_STATE_*, the SDKs JOB_STATE_*; only the suffix matters.
+    if state.endswith("_SUCCEEDED"):
+        return "ready"
+    if state.endswith(("_FAILED", "_CANCELLED", "_EXPIRED")):
+        return "error"
+    return "pending"
+
+
+def _batch_replies(operation: dict, count: int) -> list[str | None]:
+    inlined = (
+        (operation.get("response") or {}).get("inlinedResponses") or {}
+    ).get("inlinedResponses") or []
+    replies: list[str | None] = [None] * count
+    for position, item in enumerate(inlined):
+        key = (item.get("metadata") or {}).get("key")
+        index = int(key) if isinstance(key, str) and key.isdigit() else position
+        if not 0 <= index < count or not item.get("response"):
+            continue
+        text = _extract_stream_text(item["response"])
+        replies[index] = _normalize_structured_reply(text) if text else None
+    return replies
+
+
+@app.post("/api/chat/batch", response_model=LLMChatBatchJobResponse)
+async def llm_chat_batch(
+    request: LLMChatBatchRequest,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    auth: AuthContext = Depends(require_scopes("chat:write")),
+) -> LLMChatBatchJobResponse:
+    """
+    Submit many /api/chat conversations as one Gemini Batch Mode job:
+    - For bulk, latency-tolerant work (half price, no per-request RPM pressure)
+    - Replies skip the structured-format repair pass
+    - Poll /api/chat/batch/{job_id} for results
+    """
+    api_key = GEMINI_API_KEY
+    if not api_key:
+        raise HTTPException(status_code=503, detail="Gemini API key not configured.")
+
+    batch_payload = {
+        "batch": {
+            "display_name": f"chat-batch-{auth.user_id}",
+            "input_config": {
+                "requests": {
+                    "requests": [
+                        {
+                            "request": _build_chat_payload(chat_request),
+                            "metadata": {"key": str(index)},
+                        }
+                        for index, chat_request in enumerate(request.requests)
+                    ]
+                }
+            },
+        }
+    }
+    await gemini_bucket.acquire()
+    try:
+        async with _gemini_slot():
+            response = await client.post(
+                GEMINI_BATCH_URL,
+                headers=GEMINI_JSON_HEADERS,
+                params={"key": api_key},
+                json=batch_payload,
+            )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as exc:
+        logger.error(
+            "Gemini batch create error: status_code=%s response_body=%s",
+            exc.response.status_code,
+            exc.response.text[:1000],
+        )
+        raise HTTPException(status_code=502, detail=f"Gemini batch error: {exc.response.status_code}")
+    except httpx.RequestError as exc:
+        logger.error("Gemini batch request/network error: %s", exc)
+        raise HTTPException(status_code=502, detail=f"Gemini request error: {exc}")
+
+    batch_name = orjson.loads(response.content).get("name")
+    if not batch_name:
+        raise HTTPException(status_code=502, detail="Gemini batch returned no job name.")
+
+    job_id = secrets.token_hex(16)
+    CHAT_BATCH_JOBS.set(job_id, {
+        "batch_name": batch_name,
+        "count": len(request.requests),
+        "status": "pending",
+        "replies": None,
+        "error": None,
+        "owner_id": auth.user_id,
+    })
+    logger.info(
+        "Chat batch submitted job=%s batch=%s requests=%s",
+        job_id,
+        batch_name,
+        len(request.requests),
+    )
+    return LLMChatBatchJobResponse(job_id=job_id, status="pending")
+
+
+@app.get("/api/chat/batch/{job_id}", response_model=LLMChatBatchJobResponse)
+async def llm_chat_batch_job(
+    job_id: str,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    auth: AuthContext = Depends(require_scopes("chat:write")),
+) -> LLMChatBatchJobResponse:
+    job = CHAT_BATCH_JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found.")
+    if job.get("owner_id") != auth.user_id and "admin" not in auth.roles:
+        raise HTTPException(status_code=403, detail="Not authorized.")
+
+    if job["status"] == "pending":
+        api_key = GEMINI_API_KEY
+        if not api_key:
+            raise HTTPException(status_code=503, detail="Gemini API key not configured.")
+        await gemini_bucket.acquire()
+        try:
+            async with _gemini_slot():
+                response = await client.get(
+                    f"{GEMINI_API_BASE}/{job['batch_name']}",
+                    params={"key": api_key},
+                )
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            logger.error("Gemini batch poll error for job=%s: %s", job_id, exc)
+            raise HTTPException(status_code=502, detail="Gemini batch status unavailable.")
+
+        operation = orjson.loads(response.content)
+        state = str((operation.get("metadata") or {}).get("state") or "")
+        status = _batch_status(state)
+        if status == "ready":
+            job["replies"] = _batch_replies(operation, int(job["count"]))
+        elif status == "error":
+            job["error"] = f"Gemini batch ended in state {state}."
+        job["status"] = status
+
+    return LLMChatBatchJobResponse(
+        job_id=job_id,
+        status=job["status"],
+        replies=job["replies"],
+        error=job["error"],
+    )
+
+
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+async def _read_upload(upload: UploadFile, limit: int) -> bytes:
+    """Read an upload in chunks, rejecting it as soon as it exceeds `limit`."""
+    if upload.size is not None and upload.size > limit:
+        # The multipart parser already counted the spooled bytes: reject unread.
+        raise HTTPException(status_code=413, detail="Audio upload too large.")
+    buffer = bytearray()
+    while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+        buffer.extend(chunk)
+        if len(buffer) > limit:
+            raise HTTPException(status_code=413, detail="Audio upload too large.")
+    return bytes(buffer)
+
+
+async def _read_speech_audio(audio: UploadFile) -> tuple[bytes, str]:
+    audio_bytes = await _read_upload(audio, MAX_AUDIO_BYTES)
+    if not audio_bytes:
+        raise HTTPException(status_code=400, detail="Audio file is empty.")
+    mime_type = audio.content_type
+    if not mime_type:
+        if (audio.filename or "").endswith(".m4a"):
+            mime_type = "audio/mp4"
+        else:
+            mime_type = "application/octet-stream"
+    logger.info(
+        "Speech turn upload received: filename=%s content_type=%s bytes=%s",
+        audio.filename,
+        mime_type,
+        len(audio_bytes),
+    )
+    return audio_bytes, mime_type
 
 
 async def _speech_turn_handler(
@@ -735,30 +1434,14 @@ async def _speech_turn_handler(
     voice: str,
     service: SpeechTurnService,
     auth: AuthContext,
-) -> SpeechTurnResponse:
+) -> Response:
     request_start = time.perf_counter()
-    base_url = os.getenv("PUBLIC_BASE_URL") or str(request.base_url)
+    base_url = PUBLIC_BASE_URL or str(request.base_url)
     voice_name = _resolve_voice_name(voice)
     text_value = (text or "").strip()
 
     if audio is not None:
-        audio_bytes = await audio.read()
-        if not audio_bytes:
-            raise HTTPException(status_code=400, detail="Audio file is empty.")
-        if len(audio_bytes) > MAX_AUDIO_BYTES:
-            raise HTTPException(status_code=413, detail="Audio upload too large.")
-        mime_type = audio.content_type
-        if not mime_type:
-            if (audio.filename or "").endswith(".m4a"):
-                mime_type = "audio/mp4"
-            else:
-                mime_type = "application/octet-stream"
-        logger.info(
-            "Speech turn upload received: filename=%s content_type=%s bytes=%s",
-            audio.filename,
-            mime_type,
-            len(audio_bytes),
-        )
+        audio_bytes, mime_type = await _read_speech_audio(audio)
         transcript, text_result, stt_ms, llm_ms = await service.run_stt_and_llm(
             audio_bytes=audio_bytes,
             mime_type=mime_type,
@@ -789,15 +1472,16 @@ async def _speech_turn_handler(
     elapsed_ms = (time.perf_counter() - request_start) * 1000
 
     if elapsed_ms > 15000:
-        job_id = uuid4().hex
-        AUDIO_JOBS[job_id] = {
+        job_id = secrets.token_hex(16)
+        AUDIO_JOBS.set(job_id, {
             "status": "pending",
             "audio_url": None,
             "audio_base64": None,
             "audio_mime": None,
             "tts_error": None,
             "owner_id": auth.user_id,
-        }
+        })
+        AUDIO_JOB_DONE[job_id] = asyncio.Event()
         logger.info(
             "Speech turn pending audio job=%s stt_ms=%.1f llm_ms=%.1f total_ms=%.1f",
             job_id,
@@ -807,31 +1491,47 @@ async def _speech_turn_handler(
         )
 
         async def _run_audio_job() -> None:
-            audio, audio_url, audio_mime, tts_ms, tts_error = await service.synthesize_audio(
-                tts_text=tts_text,
-                target_lang=target_lang,
-                base_url=base_url,
-                voice_name=voice_name,
-            )
-            AUDIO_JOBS[job_id] = {
-                "status": "ready" if audio_url else "error",
-                "audio_url": audio_url,
-                "audio_base64": audio.base64 if audio else None,
-                "audio_mime": audio_mime,
-                "tts_error": tts_error,
-                "owner_id": auth.user_id,
-            }
-            total_ms = (time.perf_counter() - request_start) * 1000
-            logger.info(
-                "Speech turn audio job=%s tts_ms=%.1f total_ms=%.1f",
-                job_id,
-                tts_ms,
-                total_ms,
-            )
+            try:
+                audio, audio_url, audio_mime, tts_ms, tts_error = await service.synthesize_audio(
+                    tts_text=tts_text,
+                    target_lang=target_lang,
+                    base_url=base_url,
+                    voice_name=voice_name,
+                )
+            except Exception as exc:  # noqa: BLE001
+                # Long-polls wait on this job, so it must never be left pending.
+                logger.exception("Speech turn audio job=%s failed", job_id)
+                AUDIO_JOBS.set(job_id, {
+                    "status": "error",
+                    "audio_url": None,
+                    "audio_base64": None,
+                    "audio_mime": None,
+                    "tts_error": f"{type(exc).__name__}: {exc}",
+                    "owner_id": auth.user_id,
+                })
+            else:
+                audio_base64 = audio.base64 if audio is not None else None
+                AUDIO_JOBS.set(job_id, {
+                    "status": "ready" if audio_url else "error",
+                    "audio_url": audio_url,
+                    "audio_base64": audio_base64,
+                    "audio_mime": audio_mime,
+                    "tts_error": tts_error,
+                    "owner_id": auth.user_id,
+                })
+                total_ms = (time.perf_counter() - request_start) * 1000
+                logger.info(
+                    "Speech turn audio job=%s tts_ms=%.1f total_ms=%.1f",
+                    job_id,
+                    tts_ms,
+                    total_ms,
+                )
+            finally:
+                AUDIO_JOB_DONE.pop(job_id).set()
 
         asyncio.create_task(_run_audio_job())
 
-        return SpeechTurnResponse(
+        turn_response = SpeechTurnResponse(
             assistant_text=tts_text,
             source_lang=source_lang,
             target_lang=target_lang,
@@ -852,6 +1552,7 @@ async def _speech_turn_handler(
             tts_error=None,
             analysis=SpeechTurnAnalysis(overall_score=None, phoneme_confidence=[]),
         )
+        return _model_response(turn_response)
 
     audio, audio_url, audio_mime, tts_ms, tts_error = await service.synthesize_audio(
         tts_text=tts_text,
@@ -859,6 +1560,7 @@ async def _speech_turn_handler(
         base_url=base_url,
         voice_name=voice_name,
     )
+    audio_base64 = audio.base64 if audio is not None else None
     breakdown_wait_start = time.perf_counter()
     breakdown = await breakdown_task if breakdown_task else text_result.breakdown
     breakdown_wait_ms = (
@@ -874,7 +1576,7 @@ async def _speech_turn_handler(
         needs_breakdown_regen,
         total_ms,
     )
-    return SpeechTurnResponse(
+    turn_response = SpeechTurnResponse(
         assistant_text=tts_text,
         source_lang=source_lang,
         target_lang=target_lang,
@@ -888,13 +1590,14 @@ async def _speech_turn_handler(
         breakdown=breakdown,
         audio=audio,
         audio_url=audio_url,
-        audio_base64=audio.base64 if audio else None,
+        audio_base64=audio_base64,
         audio_mime=audio_mime,
         audio_job_id=None,
         audio_pending=False,
         tts_error=tts_error,
         analysis=SpeechTurnAnalysis(overall_score=None, phoneme_confidence=[]),
     )
+    return _model_response(turn_response)
 
 
 @app.post("/v1/speech/turn", response_model=SpeechTurnResponse)
@@ -909,8 +1612,8 @@ async def speech_turn(
     voice: str = Form("warm"),
     service: SpeechTurnService = Depends(get_speech_turn_service),
     auth: AuthContext = Depends(require_scopes("speech:write")),
-) -> SpeechTurnResponse:
-    rate_limiter.check(_client_key(request, "speech_turn"), limit=10, window_seconds=60)
+) -> Response:
+    rate_limiter.check("speech_turn", _client_host(request), limit=10, window_seconds=60)
     return await _speech_turn_handler(
         request=request,
         audio=audio,
@@ -925,9 +1628,21 @@ async def speech_turn(
     )
 
 
-@app.post("/speech_turn", response_model=SpeechTurnResponse)
-async def speech_turn_alias(
+# Legacy path kept for older clients; same handler as /v1/speech/turn.
+app.add_api_route(
+    "/speech_turn",
+    speech_turn,
+    methods=["POST"],
+    response_model=SpeechTurnResponse,
+    deprecated=True,
+)
+
+
+@app.post("/v1/smoke/login-and-turn")
+async def smoke_login_and_turn(
     request: Request,
+    username: str = Form(..., min_length=3, max_length=200),
+    password: str = Form(..., min_length=8, max_length=200),
     audio: UploadFile | None = File(None),
     text: str | None = Form(None),
     level: str = Form("beginner"),
@@ -936,10 +1651,25 @@ async def speech_turn_alias(
     target_lang: str = Form("zh"),
     voice: str = Form("warm"),
     service: SpeechTurnService = Depends(get_speech_turn_service),
-    auth: AuthContext = Depends(require_scopes("speech:write")),
-) -> SpeechTurnResponse:
-    rate_limiter.check(_client_key(request, "speech_turn"), limit=10, window_seconds=60)
-    return await _speech_turn_handler(
+) -> Response:
+    """Login and one speech turn in a single round trip, for smoke runs.
+
+    Disabled (404) unless ENABLE_SMOKE_ENDPOINTS is set. Returns
+    {"auth": <login response>, "turn": <speech turn response>}; the refresh
+    token follows the same X-Client-Type rules as /auth/login.
+    """
+    if not SMOKE_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    rate_limiter.check("login", _client_host(request), limit=5, window_seconds=60)
+    _require_https(request)
+    if not verify_password(username, password):
+        raise HTTPException(status_code=401, detail="Invalid credentials.")
+    # Only charge the turn quota once the caller has proven who they are.
+    rate_limiter.check("speech_turn", _client_host(request), limit=10, window_seconds=60)
+    roles = get_default_roles(username)
+    scopes = ["chat:write", "speech:write"]
+    tokens = issue_tokens(username, roles=roles, scopes=scopes)
+    turn = await _speech_turn_handler(
         request=request,
         audio=audio,
         text=text,
@@ -949,23 +1679,151 @@ async def speech_turn_alias(
         target_lang=target_lang,
         voice=voice,
         service=service,
-        auth=auth,
+        auth=AuthContext(user_id=username, roles=roles, scopes=scopes),
+    )
+    login_payload = _login_payload(request, tokens)
+    # The turn body is already serialized; splice it in rather than re-encoding it.
+    response = Response(
+        b'{"auth":' + login_payload.model_dump_json().encode() + b',"turn":' + turn.body + b"}",
+        media_type="application/json",
     )
+    if _is_web_client(request):
+        _set_refresh_cookie(response, tokens["refresh_token"])
+    return response
+
+
+def _sse_event(event: str, data: dict[str, Any]) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+@app.post("/v1/speech/turn/stream")
+async def speech_turn_stream(
+    request: Request,
+    audio: UploadFile | None = File(None),
+    text: str | None = Form(None),
+    level: str = Form("beginner"),
+    scenario: str = Form("restaurant"),
+    source_lang: str = Form("en"),
+    target_lang: str = Form("zh"),
+    voice: str = Form("warm"),
+    service: SpeechTurnService = Depends(get_speech_turn_service),
+    auth: AuthContext = Depends(require_scopes("speech:write")),
+) -> StreamingResponse:
+    """
+    Server-Sent Events variant of /v1/speech/turn, one event per stage as it finishes:
+    - `transcript`: {"transcript"}
+    - `text`: {"assistant_text", "normalized_request", "intent", "chinese", "pinyin", "notes", "breakdown"}
+    - `audio`: {"audio_url", "audio_mime", "tts_error"}
+    - `breakdown`: {"breakdown"}, only when the character breakdown had to be regenerated
+    - `error`: {"detail"} if a stage fails, then `done`
+    """
+    rate_limiter.check("speech_turn", _client_host(request), limit=10, window_seconds=60)
+    base_url = PUBLIC_BASE_URL or str(request.base_url)
+    voice_name = _resolve_voice_name(voice)
+    text_value = (text or "").strip()
+    # Read the upload before streaming starts so bad input still gets a plain 4xx.
+    if audio is not None:
+        audio_bytes, mime_type = await _read_speech_audio(audio)
+    elif not text_value:
+        raise HTTPException(status_code=400, detail="Either audio or text is required.")
+
+    async def _events():
+        try:
+            if audio is not None:
+                transcript, _ = await service.transcribe(
+                    audio_bytes=audio_bytes,
+                    mime_type=mime_type,
+                    source_lang=source_lang,
+                )
+            else:
+                transcript = text_value
+            yield _sse_event("transcript", {"transcript": transcript})
+
+            text_result, _ = await service.generate_text(
+                transcript=transcript,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                scenario=scenario,
+            )
+            chinese, pinyin, notes, tts_text = _build_response_parts(transcript, text_result)
+            yield _sse_event("text", {
+                "assistant_text": tts_text,
+                "normalized_request": text_result.normalized_request,
+                "intent": text_result.intent,
+                "chinese": chinese,
+                "pinyin": pinyin,
+                "notes": notes,
+                "breakdown": [item.model_dump() for item in text_result.breakdown],
+            })
+
+            breakdown_task = (
+                asyncio.create_task(
+                    _ensure_character_breakdown(service._text_client, text_result, transcript)
+                )
+                if target_lang == "zh"
+                and not _has_character_level_breakdown(chinese, text_result.breakdown)
+                else None
+            )
+            _, audio_url, audio_mime, _, tts_error = await service.synthesize_audio(
+                tts_text=tts_text,
+                target_lang=target_lang,
+                base_url=base_url,
+                voice_name=voice_name,
+            )
+            yield _sse_event("audio", {
+                "audio_url": audio_url,
+                "audio_mime": audio_mime,
+                "tts_error": tts_error,
+            })
+            if breakdown_task is not None:
+                breakdown = await breakdown_task
+                yield _sse_event(
+                    "breakdown", {"breakdown": [item.model_dump() for item in breakdown]}
+                )
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Speech turn stream failed: %s: %s", type(exc).__name__, exc)
+            yield _sse_event("error", {"detail": "Speech turn failed."})
+        yield b"event: done\ndata: {}\n\n"
+
+    return StreamingResponse(_events(), media_type="text/event-stream")
 
 
 @app.get("/v1/speech/audio/{job_id}", response_model=SpeechAudioJobResponse)
 async def speech_audio_job(
-    job_id: str, auth: AuthContext = Depends(require_scopes("speech:write"))
-) -> SpeechAudioJobResponse:
+    job_id: str,
+    wait_ms: int = Query(0, ge=0, le=MAX_AUDIO_JOB_WAIT_MS),
+    auth: AuthContext = Depends(require_scopes("speech:write")),
+) -> Response:
     job = AUDIO_JOBS.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Audio job not found.")
     if job.get("owner_id") != auth.user_id and "admin" not in auth.roles:
         raise HTTPException(status_code=403, detail="Not authorized.")
-    return SpeechAudioJobResponse(
+    if wait_ms:
+        # Long-poll: hold the request until the job finishes or the window closes,
+        # then answer 202 if it is still pending.
+        done = AUDIO_JOB_DONE.get(job_id)
+        if done is not None:
+            try:
+                await asyncio.wait_for(done.wait(), wait_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            job = AUDIO_JOBS.get(job_id) or job
+        if (job.get("status") or "pending") == "pending":
+            return Response(
+                SpeechAudioJobResponse(status="pending").model_dump_json(),
+                status_code=202,
+                media_type="application/json",
+                headers={"X-Job-Status": "pending"},
+            )
+    job_response = SpeechAudioJobResponse(
         status=job.get("status") or "pending",
         audio_url=job.get("audio_url"),
         audio_base64=job.get("audio_base64"),
         audio_mime=job.get("audio_mime"),
         tts_error=job.get("tts_error"),
     )
+    response = _model_response(job_response)
+    # Lets pollers decide whether to keep waiting without decoding the body.
+    response.headers["X-Job-Status"] = job_response.status
+    return response
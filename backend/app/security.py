@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import heapq
 import logging
 import os
 import re
+import secrets
+import time
 from typing import Any, Callable
-from uuid import uuid4
 
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 import jwt
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -15,12 +20,20 @@ from passlib.context import CryptContext
 
 logger = logging.getLogger(__name__)
 
+# Argon2id at the OWASP baseline (46 MiB, t=2, p=1). bcrypt hashes are still accepted
+# through passlib so existing AUTH_DEFAULT_PASSWORD_HASH values keep working.
+password_hasher = PasswordHasher(time_cost=2, memory_cost=46 * 1024, parallelism=1)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer(auto_error=False)
 
 ACCESS_TOKEN_TTL_MINUTES = int(os.getenv("ACCESS_TOKEN_TTL_MINUTES", "15"))
 REFRESH_TOKEN_TTL_DAYS = int(os.getenv("REFRESH_TOKEN_TTL_DAYS", "30"))
 AUDIO_TOKEN_TTL_MINUTES = int(os.getenv("AUDIO_TOKEN_TTL_MINUTES", "10"))
+REFRESH_SWEEP_INTERVAL_SECS = int(os.getenv("REFRESH_SWEEP_INTERVAL_SECS", "3600"))
+MAX_REFRESH_STORE = int(os.getenv("MAX_REFRESH_STORE", "10000"))
+_ACCESS_TTL = ACCESS_TOKEN_TTL_MINUTES * 60
+_REFRESH_TTL = REFRESH_TOKEN_TTL_DAYS * 86400
+_AUDIO_TTL = AUDIO_TOKEN_TTL_MINUTES * 60
 
 ACCESS_TOKEN_SECRET = os.getenv("ACCESS_TOKEN_SECRET", "")
 REFRESH_TOKEN_SECRET = os.getenv("REFRESH_TOKEN_SECRET", "")
@@ -28,9 +41,13 @@ AUDIO_TOKEN_SECRET = os.getenv("AUDIO_TOKEN_SECRET", "") or ACCESS_TOKEN_SECRET
 AUTH_DEFAULT_USER = os.getenv("AUTH_DEFAULT_USER", "")
 AUTH_DEFAULT_PASSWORD_HASH = os.getenv("AUTH_DEFAULT_PASSWORD_HASH", "")
 AUTH_DEFAULT_PASSWORD = os.getenv("AUTH_DEFAULT_PASSWORD", "")
-ADMIN_USERS = {u.strip() for u in os.getenv("ADMIN_USERS", "").split(",") if u.strip()}
+ADMIN_USERS = frozenset(u.strip() for u in os.getenv("ADMIN_USERS", "").split(",") if u.strip())
 
 REFRESH_TOKEN_STORE: dict[str, dict[str, Any]] = {}
+# (expires_at, jti) min-heap so expired entries can be dropped without scanning the store.
+# Rotated/revoked jtis stay in the heap until they expire or the heap is compacted;
+# popping them is a no-op.
+_REFRESH_EXPIRY_HEAP: list[tuple[int, str]] = []
 
 
 def _demo_auth_disabled() -> bool:
@@ -69,11 +86,17 @@ def _auth_default_password() -> str:
     return os.getenv("AUTH_DEFAULT_PASSWORD", AUTH_DEFAULT_PASSWORD)
 
 
-def _admin_users() -> set[str]:
+@lru_cache(maxsize=1)
+def _parse_admin_users(raw: str) -> frozenset[str]:
+    return frozenset(u.strip() for u in raw.split(",") if u.strip())
+
+
+def _admin_users() -> frozenset[str]:
+    # Still read per call so env changes apply; the split is only redone when it changes.
     raw = os.getenv("ADMIN_USERS")
     if raw is None:
         return ADMIN_USERS
-    return {u.strip() for u in raw.split(",") if u.strip()}
+    return _parse_admin_users(raw)
 
 
 class AuthError(HTTPException):
@@ -107,64 +130,94 @@ def verify_password(username: str, password: str) -> bool:
         )
     if username != auth_user:
         return False
+    if auth_hash.startswith("$argon2"):
+        try:
+            return password_hasher.verify(auth_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
     if auth_hash:
+        logger.warning("AUTH_DEFAULT_PASSWORD_HASH is bcrypt; regenerate it with Argon2id.")
         return pwd_context.verify(password, auth_hash)
     logger.warning("Using plaintext auth password; set AUTH_DEFAULT_PASSWORD_HASH.")
     return auth_password == password
 
 
-def _now() -> datetime:
-    return datetime.now(timezone.utc)
+def _now() -> int:
+    # JWT iat/exp are integer epoch seconds; no need to round-trip through datetime.
+    return int(time.time())
 
 
 def _encode_jwt(payload: dict[str, Any], secret: str) -> str:
     return jwt.encode(payload, secret, algorithm="HS256")
 
 
-def _decode_jwt(token: str, secret: str) -> dict[str, Any]:
-    return jwt.decode(token, secret, algorithms=["HS256"])
+def _decode_jwt(token: str, secret: str, detail: str) -> dict[str, Any]:
+    # Any PyJWT failure (bad signature, expiry, garbage) is the caller's 401, never a 500.
+    try:
+        return jwt.decode(token, secret, algorithms=["HS256"])
+    except jwt.PyJWTError as exc:
+        raise AuthError(detail) from exc
 
 
 def issue_tokens(user_id: str, roles: list[str], scopes: list[str]) -> dict[str, Any]:
     _require_secrets()
     issued_at = _now()
-    access_exp = issued_at + timedelta(minutes=ACCESS_TOKEN_TTL_MINUTES)
-    refresh_exp = issued_at + timedelta(days=REFRESH_TOKEN_TTL_DAYS)
+    purge_expired_refresh_tokens(issued_at)
+    _enforce_refresh_store_cap()
+    access_exp = issued_at + _ACCESS_TTL
+    refresh_exp = issued_at + _REFRESH_TTL
     access_payload = {
         "sub": user_id,
         "roles": roles,
         "scopes": scopes,
         "type": "access",
-        "iat": int(issued_at.timestamp()),
-        "exp": int(access_exp.timestamp()),
+        "iat": issued_at,
+        "exp": access_exp,
     }
-    refresh_jti = uuid4().hex
+    refresh_jti = secrets.token_hex(16)
     refresh_payload = {
         "sub": user_id,
         "roles": roles,
         "scopes": scopes,
         "type": "refresh",
         "jti": refresh_jti,
-        "iat": int(issued_at.timestamp()),
-        "exp": int(refresh_exp.timestamp()),
+        "iat": issued_at,
+        "exp": refresh_exp,
     }
     refresh_token = _encode_jwt(refresh_payload, _refresh_token_secret())
     REFRESH_TOKEN_STORE[refresh_jti] = {
         "user_id": user_id,
         "expires_at": refresh_exp,
     }
+    heapq.heappush(_REFRESH_EXPIRY_HEAP, (refresh_exp, refresh_jti))
+    _compact_refresh_expiry_heap()
     return {
         "access_token": _encode_jwt(access_payload, _access_token_secret()),
         "access_expires_at": access_exp,
+        "access_expires_in": _ACCESS_TTL,
         "refresh_token": refresh_token,
         "refresh_expires_at": refresh_exp,
         "refresh_jti": refresh_jti,
     }
 
 
+def _unverified_jti(token: str) -> str | None:
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return None
+    jti = claims.get("jti")
+    return jti if isinstance(jti, str) else None
+
+
 def rotate_refresh_token(refresh_token: str) -> dict[str, Any]:
     _require_secrets()
-    payload = _decode_jwt(refresh_token, _refresh_token_secret())
+    # Unknown/revoked jtis are rejected from the unverified claims, so replaying them
+    # costs a dict lookup rather than an HMAC. The signature check below still guards
+    # every token that is actually honoured.
+    if _unverified_jti(refresh_token) not in REFRESH_TOKEN_STORE:
+        raise AuthError("Refresh token revoked.")
+    payload = _decode_jwt(refresh_token, _refresh_token_secret(), "Invalid refresh token.")
     if payload.get("type") != "refresh":
         raise AuthError("Invalid refresh token type.")
     jti = payload.get("jti")
@@ -184,15 +237,59 @@ def rotate_refresh_token(refresh_token: str) -> dict[str, Any]:
 
 def revoke_refresh_token(refresh_token: str) -> None:
     _require_secrets()
+    if _unverified_jti(refresh_token) not in REFRESH_TOKEN_STORE:
+        return
     try:
-        payload = _decode_jwt(refresh_token, _refresh_token_secret())
-    except jwt.PyJWTError:
+        payload = _decode_jwt(refresh_token, _refresh_token_secret(), "Invalid refresh token.")
+    except AuthError:
         return
     jti = payload.get("jti")
     if jti:
         REFRESH_TOKEN_STORE.pop(jti, None)
 
 
+def purge_expired_refresh_tokens(now: int | None = None) -> int:
+    if now is None:
+        now = _now()
+    purged = 0
+    while _REFRESH_EXPIRY_HEAP and _REFRESH_EXPIRY_HEAP[0][0] < now:
+        _, jti = heapq.heappop(_REFRESH_EXPIRY_HEAP)
+        if REFRESH_TOKEN_STORE.pop(jti, None) is not None:
+            purged += 1
+    return purged
+
+
+def _compact_refresh_expiry_heap() -> None:
+    # Every rotation leaves a stale entry behind; once they outnumber the live ones,
+    # rebuild the heap from the store so it stays bounded by the store, not by 30 days
+    # of issues.
+    if len(_REFRESH_EXPIRY_HEAP) <= 2 * len(REFRESH_TOKEN_STORE) + 64:
+        return
+    _REFRESH_EXPIRY_HEAP[:] = [(entry["expires_at"], jti) for jti, entry in REFRESH_TOKEN_STORE.items()]
+    heapq.heapify(_REFRESH_EXPIRY_HEAP)
+
+
+def _enforce_refresh_store_cap() -> None:
+    # Called after the expired entries are purged, so a full store holds only live
+    # sessions: refuse the new one rather than sign existing users out.
+    if len(REFRESH_TOKEN_STORE) < MAX_REFRESH_STORE:
+        return
+    logger.warning("Refresh token store full (%s sessions); rejecting new session", MAX_REFRESH_STORE)
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many active sessions. Please try again later.",
+    )
+
+
+async def sweep_refresh_tokens(interval_seconds: int = REFRESH_SWEEP_INTERVAL_SECS) -> None:
+    # Abandoned refresh tokens are otherwise only dropped when rotated or revoked.
+    while True:
+        await asyncio.sleep(interval_seconds)
+        purged = purge_expired_refresh_tokens()
+        if purged:
+            logger.info("Purged %s expired refresh tokens", purged)
+
+
 def get_auth_context(
     credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
 ) -> AuthContext:
@@ -206,10 +303,10 @@ def get_auth_context(
     if not credentials or credentials.scheme.lower() != "bearer":
         raise AuthError("Missing access token.")
     token = credentials.credentials
-    try:
-        payload = _decode_jwt(token, _access_token_secret())
-    except jwt.PyJWTError:
+    # A JWS has exactly three segments; reject junk before PyJWT parses and HMACs it.
+    if token.count(".") != 2:
         raise AuthError("Invalid access token.")
+    payload = _decode_jwt(token, _access_token_secret(), "Invalid access token.")
     if payload.get("type") != "access":
         raise AuthError("Invalid access token type.")
     return AuthContext(
@@ -256,35 +353,46 @@ def create_audio_token(filename: str) -> str:
             detail="Audio token secret not configured.",
         )
     issued_at = _now()
-    exp = issued_at + timedelta(minutes=AUDIO_TOKEN_TTL_MINUTES)
     payload = {
         "type": "audio",
         "file": filename,
-        "iat": int(issued_at.timestamp()),
-        "exp": int(exp.timestamp()),
+        "iat": issued_at,
+        "exp": issued_at + _AUDIO_TTL,
     }
     return _encode_jwt(payload, audio_secret)
 
 
 def verify_audio_token(token: str, filename: str) -> None:
-    try:
-        payload = _decode_jwt(token, _audio_token_secret())
-    except jwt.PyJWTError:
-        raise AuthError("Invalid audio token.")
+    payload = _decode_jwt(token, _audio_token_secret(), "Invalid audio token.")
     if payload.get("type") != "audio" or payload.get("file") != filename:
         raise AuthError("Invalid audio token.")
 
 
-class RedactFilter(logging.Filter):
-    _pattern = re.compile(r"(Bearer\s+)[A-Za-z0-9\-._~+/]+=*|refresh_token=([^;\\s]+)")
+_BEARER_RE = re.compile(r"Bearer\s+[A-Za-z0-9\-._~+/]+=*")
+_REFRESH_COOKIE_RE = re.compile(r"refresh_token=[^;\s]+")
+
 
+def _redact(text: str) -> str:
+    # Substring checks first: most log lines carry neither secret, so skip the regexes.
+    if "Bearer" in text:
+        text = _BEARER_RE.sub("Bearer [REDACTED]", text)
+    if "refresh_token=" in text:
+        text = _REFRESH_COOKIE_RE.sub("refresh_token=[REDACTED]", text)
+    return text
+
+
+class RedactFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
         if isinstance(record.msg, str):
-            record.msg = self._pattern.sub(r"\\1[REDACTED]", record.msg)
-        if record.args:
-            record.args = tuple(
-                self._pattern.sub(r"\\1[REDACTED]", str(arg)) for arg in record.args
-            )
+            record.msg = _redact(record.msg)
+        if record.args and isinstance(record.args, tuple):
+            args = []
+            for arg in record.args:
+                text = str(arg)
+                redacted = _redact(text)
+                # Keep the original object unless it leaked a secret, so %d/%.1f still format.
+                args.append(arg if redacted == text else redacted)
+            record.args = tuple(args)
         return True
 
 
@@ -5,6 +5,7 @@ import os
 from typing import Any
 
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +13,12 @@ DEFAULT_ELEVENLABS_VOICE_ID = "JBFqnCBsd6RMkjVDRZzb"
 
 
 class ElevenLabsTTSClient:
-    def __init__(self, api_key: str, model: str | None = None) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str | None = None,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
         if not api_key:
             raise ValueError("ElevenLabs API key not configured.")
         self._api_key = api_key
@@ -22,7 +28,7 @@ class ElevenLabsTTSClient:
             "Leda": os.getenv("ELEVENLABS_VOICE_ID_BRIGHT", DEFAULT_ELEVENLABS_VOICE_ID),
             "Puck": os.getenv("ELEVENLABS_VOICE_ID_DEEP", DEFAULT_ELEVENLABS_VOICE_ID),
         }
-        self._client = httpx.AsyncClient(timeout=30.0)
+        self._client = client or httpx.AsyncClient(timeout=30.0)
 
     def _resolve_voice_id(self, voice_name: str) -> str:
         return self._voice_ids.get(voice_name, DEFAULT_ELEVENLABS_VOICE_ID)
@@ -55,7 +61,7 @@ class ElevenLabsTTSClient:
                 "xi-api-key": self._api_key,
                 "Accept": "audio/mpeg",
             },
-            json=payload,
+            content=orjson.dumps(payload),
         )
         response.raise_for_status()
         audio_bytes = response.content
@@ -1,77 +1,90 @@
 from __future__ import annotations
 
-import base64
+import binascii
+
 import httpx
+import orjson
+
+# Stands in for the audio in the serialized payload; the base64 bytes are spliced in
+# afterwards so the (large) audio is never decoded to str or re-escaped as JSON.
+_AUDIO_PLACEHOLDER = "__inline_audio__"
+
+
+# Static parts of the request, built once and shared by every payload.
+_SYSTEM_INSTRUCTIONS = {
+    "zh": {
+        "parts": [
+            {
+                "text": (
+                    "You are a speech transcription engine for a Chinese language learning app. "
+                    "Transcribe the user's spoken Chinese as natural Simplified Chinese characters. "
+                    "Return ONLY the transcript text."
+                )
+            }
+        ]
+    },
+    "en": {
+        "parts": [
+            {
+                "text": (
+                    "You are a speech transcription engine for an English learning app. "
+                    "Transcribe the user's spoken request as natural English. "
+                    "Fix obvious speech-to-text mishearings (e.g., stay→say, and→in) "
+                    "without shortening the sentence or changing its meaning. "
+                    "Return ONLY the transcript text."
+                )
+            }
+        ]
+    },
+}
+_GENERATION_CONFIG = {"temperature": 0, "maxOutputTokens": 128}
+_TRANSCRIBE_PART = {"text": "Transcribe this audio."}
+
+
+def _splice_audio(body: bytes, audio_bytes: bytes) -> bytes:
+    head, tail = body.split(_AUDIO_PLACEHOLDER.encode(), 1)
+    return b"".join((head, binascii.b2a_base64(audio_bytes, newline=False), tail))
 
 
 class GeminiSTTClient:
-    def __init__(self, api_key: str, model: str = "gemini-2.5-flash") -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.5-flash",
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
         if not api_key:
             raise ValueError("Gemini API key not configured.")
         self._api_key = api_key
         self._model = model
-        self._client = httpx.AsyncClient(timeout=30.0)  # reuse connections
-
-    def _needs_normalization(self, t: str, source_lang: str = "en") -> bool:
-        # Chinese transcription has different error patterns — skip English-specific normalization
-        if source_lang == "zh":
-            return False
-        s = (t or "").strip()
-        if len(s.split()) <= 2:
-            return True
-        # common garbage patterns
-        lower = s.lower()
-        return any(x in lower for x in [" and chinese", " stay ", " bargain chip"])
-
-    # --- STEP 1: raw transcription (unchanged logic) ---
-    async def transcribe_raw(self, audio_bytes: bytes, mime_type: str, source_lang: str) -> str:
-        encoded = base64.b64encode(audio_bytes).decode("utf-8")
-
-        if source_lang == "zh":
-            system_text = (
-                "You are a speech transcription engine for a Chinese language learning app. "
-                "Transcribe the user's spoken Chinese as natural Simplified Chinese characters. "
-                "Return ONLY the transcript text."
-            )
-        else:
-            system_text = (
-                "You are a speech transcription engine for an English learning app. "
-                "Transcribe the user's spoken request as natural English. "
-                "Return ONLY the transcript text."
-            )
+        self._url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent"
+        self._headers = {"Content-Type": "application/json", "x-goog-api-key": api_key}
+        self._client = client or httpx.AsyncClient(timeout=30.0)  # reuse connections
 
+    # --- STEP 1: transcription (misheard-word cleanup is folded into the same call) ---
+    async def transcribe_raw(self, audio_bytes: bytes, mime_type: str, source_lang: str) -> str:
         payload = {
-            "systemInstruction": {
-                "parts": [
-                    {
-                        "text": system_text
-                    }
-                ]
-            },
-            "generationConfig": {
-                "temperature": 0,
-                "maxOutputTokens": 128,
-            },
+            "systemInstruction": _SYSTEM_INSTRUCTIONS["zh" if source_lang == "zh" else "en"],
+            "generationConfig": _GENERATION_CONFIG,
             "contents": [
                 {
                     "role": "user",
                     "parts": [
-                        {"text": "Transcribe this audio."},
-                        {"inlineData": {"mimeType": mime_type, "data": encoded}},
+                        _TRANSCRIBE_PART,
+                        {"inlineData": {"mimeType": mime_type, "data": _AUDIO_PLACEHOLDER}},
                     ],
                 }
             ],
         }
 
         response = await self._client.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent",
-            headers={"Content-Type": "application/json"},
-            params={"key": self._api_key},
-            json=payload,
+            self._url,
+            headers=self._headers,
+            content=_splice_audio(orjson.dumps(payload), audio_bytes),
         )
 
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
 
         parts = (
             data.get("candidates", [{}])[0]
@@ -88,60 +101,6 @@ class GeminiSTTClient:
 
         return transcript.strip()
 
-    # --- STEP 2: normalize obvious STT errors ---
-    async def normalize_transcript(self, transcript: str) -> str:
-        prompt = (
-            "You are cleaning up speech-to-text mistakes.\n"
-            "Rules:\n"
-            "1) Do NOT shorten the sentence.\n"
-            "2) Preserve ALL meaning and most words.\n"
-            "3) Only fix misheard words (e.g., stay→say, and→in).\n"
-            "4) If the transcript is already understandable, return it unchanged.\n"
-            "Return ONLY the corrected sentence.\n\n"
-            f"Transcript: {transcript}"
-        )
-
-        payload = {
-            "generationConfig": {
-                "temperature": 0,
-                "maxOutputTokens": 64,
-            },
-            "contents": [
-                {
-                    "role": "user",
-                    "parts": [{"text": prompt}],
-                }
-            ],
-        }
-
-        response = await self._client.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent",
-            headers={"Content-Type": "application/json"},
-            params={"key": self._api_key},
-            json=payload,
-        )
-
-        response.raise_for_status()
-        data = response.json()
-
-        parts = (
-            data.get("candidates", [{}])[0]
-            .get("content", {})
-            .get("parts", [{}])
-        )
-        cleaned = next(
-            (p.get("text", "").strip() for p in parts if not p.get("thought") and p.get("text")),
-            "",
-        )
-
-        # Fallback safely if model returns nothing
-        return cleaned or transcript
-    
-
-    # --- STEP 3: public API (what the rest of your app already uses) ---
+    # --- STEP 2: public API (what the rest of your app already uses) ---
     async def transcribe(self, audio_bytes: bytes, mime_type: str, source_lang: str) -> str:
-        raw = await self.transcribe_raw(audio_bytes, mime_type, source_lang)
-        if self._needs_normalization(raw, source_lang):
-            norm = await self.normalize_transcript(raw)
-            return norm
-        return raw
\ No newline at end of file
+        return await self.transcribe_raw(audio_bytes, mime_type, source_lang)
\ No newline at end of file
@@ -1,29 +1,53 @@
 from __future__ import annotations
 
-import base64
-import json
+from functools import lru_cache
 import logging
 import os
 import re
 from typing import Any
 
 import httpx
+import orjson
+import pybase64
 
 logger = logging.getLogger(__name__)
 
+_RATE_RE = re.compile(r"rate=(\d+)")
+
+
+@lru_cache(maxsize=32)
+def _generation_config(voice_name: str) -> dict[str, Any]:
+    # Only the voice varies; reuse the nested config per voice.
+    return {
+        "responseModalities": ["AUDIO"],
+        "speechConfig": {
+            "voiceConfig": {
+                "prebuiltVoiceConfig": {"voiceName": voice_name}
+            }
+        },
+    }
+
 
 class GeminiTTSClient:
-    def __init__(self, api_key: str, model: str | None = None) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str | None = None,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
         if not api_key:
             raise ValueError("Gemini API key not configured.")
         self._api_key = api_key
         self._model = model or os.getenv("GEMINI_TTS_MODEL", "gemini-2.5-flash-preview-tts")
+        self._url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent"
+        self._headers = {"Content-Type": "application/json", "x-goog-api-key": api_key}
+        self._client = client or httpx.AsyncClient(timeout=45.0)
 
     def _parse_rate(self, mime_type: str | None) -> int:
         # mime often looks like: audio/L16;codec=pcm;rate=24000
         if not mime_type:
             return 24000
-        m = re.search(r"rate=(\d+)", mime_type)
+        m = _RATE_RE.search(mime_type)
         return int(m.group(1)) if m else 24000
 
     async def synthesize(
@@ -48,57 +72,46 @@ class GeminiTTSClient:
                     ]
                 }
             ],
-            "generationConfig": {
-                "responseModalities": ["AUDIO"],
-                "speechConfig": {
-                    "voiceConfig": {
-                        "prebuiltVoiceConfig": {"voiceName": voice_name}
-                    }
-                },
-            },
+            "generationConfig": _generation_config(voice_name),
             "model": self._model,
         }
 
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent"
+        url = self._url
         logger.info("TTS request payload: %s", payload)
 
 
-        async with httpx.AsyncClient(timeout=45.0) as client:
-            response = await client.post(
-                url,
-                headers={"Content-Type": "application/json"},
-                params={"key": self._api_key},  # keep consistent with your text call
-                json=payload,
-            )
+        response = await self._client.post(
+            url,
+            headers=self._headers,
+            content=orjson.dumps(payload),
+            timeout=45.0,
+        )
 
         if response.status_code >= 400:
             print("Gemini TTS error:", response.status_code, response.text)
 
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
 
         candidate = (data.get("candidates") or [{}])[0]
         parts = candidate.get("content", {}).get("parts", []) or []
 
-        encoded_audio = None
-        mime_type = None
-
-        for part in parts:
-            inline = part.get("inlineData") or {}
-            if inline.get("data"):
-                encoded_audio = inline["data"]
-                mime_type = inline.get("mimeType")
-                break
+        inline = next(
+            (p["inlineData"] for p in parts if (p.get("inlineData") or {}).get("data")),
+            None,
+        )
 
-        if not encoded_audio:
+        if inline is None:
             finish_reason = candidate.get("finishReason", "unknown")
-            response_json = json.dumps(data, ensure_ascii=False, indent=2)
+            response_json = orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
             if len(response_json) > 4000:
                 response_json = response_json[:4000] + "...(truncated)"
             print("Gemini TTS missing audio. finishReason:", finish_reason, "response:", response_json)
             raise ValueError(f"Gemini TTS returned no audio. finishReason={finish_reason}.")
 
-        pcm_bytes = base64.b64decode(encoded_audio)
+        # SIMD (AVX2/NEON) decoder; validate=True still rejects stray non-base64 input.
+        pcm_bytes = pybase64.b64decode(inline["data"], validate=True)
+        mime_type = inline.get("mimeType")
         logger.info("TTS audio bytes length: %s", len(pcm_bytes))
         rate = self._parse_rate(mime_type)
 
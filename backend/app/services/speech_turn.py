@@ -1,17 +1,20 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import hashlib
 import logging
 import mimetypes
 import os
 import re
+import secrets
+import struct
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Any, Literal
-from uuid import uuid4
 
 import httpx
+import orjson
 
 from app.security import create_audio_token
 
@@ -26,6 +29,10 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_TTS_VOICE = "Kore"
 TTS_FALLBACK_VOICES = ("Kore", "Leda", "Puck")
+AUDIO_FILE_TTL_SECONDS = int(os.getenv("AUDIO_FILE_TTL_SECONDS", "900"))
+# Cap on a server-provided Retry-After so one throttled turn can't hang the request.
+MAX_RETRY_WAIT_SECONDS = 4.0
+TTS_CACHE_MAX_ENTRIES = int(os.getenv("TTS_CACHE_MAX_ENTRIES", "1024"))
 
 
 @dataclass
@@ -40,13 +47,77 @@ class SpeechTurnTextResult:
     breakdown: list[SpeechTurnBreakdownItem]
 
 
+_TEXT_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "normalized_request": {"type": "string"},
+        "intent": {"type": "string", "enum": ["translate_request", "unknown"]},
+        "target_text": {"type": "string"},
+        "romanization": {"type": "string"},
+        "chinese": {"type": "string"},
+        "pinyin": {"type": "string"},
+        "notes": {"type": "array", "items": {"type": "string"}},
+        "breakdown": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "text": {"type": "string"},
+                    "pronunciation": {"type": "string"},
+                    "gloss": {"type": "string"},
+                },
+                "required": ["text", "pronunciation", "gloss"],
+            },
+        },
+    },
+    "required": [
+        "normalized_request",
+        "intent",
+        "target_text",
+        "romanization",
+        "chinese",
+        "pinyin",
+        "notes",
+        "breakdown",
+    ],
+}
+
+_PROMPT_PLACEHOLDER = "__prompt__"
+_GENERATE_BODY_PREFIX, _GENERATE_BODY_SUFFIX = orjson.dumps(
+    {
+        "generationConfig": {
+            "temperature": 0.2,
+            "maxOutputTokens": 512,
+            "responseMimeType": "application/json",
+            "responseSchema": _TEXT_RESULT_SCHEMA,
+        },
+        "contents": [{"role": "user", "parts": [{"text": _PROMPT_PLACEHOLDER}]}],
+    }
+).split(orjson.dumps(_PROMPT_PLACEHOLDER))
+
+
+def _retry_wait(response: httpx.Response, default: float) -> float:
+    try:
+        wait = float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return default
+    return min(max(wait, 0.0), MAX_RETRY_WAIT_SECONDS)
+
+
 class GeminiSpeechTurnTextClient:
-    def __init__(self, api_key: str, model: str = "gemini-2.5-flash") -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.5-flash",
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
         if not api_key:
             raise ValueError("Gemini API key not configured.")
         self._api_key = api_key
         self._model = model
-        self._client = httpx.AsyncClient(timeout=30.0)  # reuse connections
+        self._url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent"
+        self._headers = {"Content-Type": "application/json", "x-goog-api-key": api_key}
+        self._client = client or httpx.AsyncClient(timeout=30.0)  # reuse connections
 
     async def generate(
         self,
@@ -124,64 +195,20 @@ class GeminiSpeechTurnTextClient:
             f" Transcript: {transcript}"
         )
 
-        response_schema = {
-            "type": "object",
-            "properties": {
-                "normalized_request": {"type": "string"},
-                "intent": {"type": "string", "enum": ["translate_request", "unknown"]},
-                "target_text": {"type": "string"},
-                "romanization": {"type": "string"},
-                "chinese": {"type": "string"},
-                "pinyin": {"type": "string"},
-                "notes": {"type": "array", "items": {"type": "string"}},
-                "breakdown": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "pronunciation": {"type": "string"},
-                            "gloss": {"type": "string"},
-                        },
-                        "required": ["text", "pronunciation", "gloss"],
-                    },
-                },
-            },
-            "required": [
-                "normalized_request",
-                "intent",
-                "target_text",
-                "romanization",
-                "chinese",
-                "pinyin",
-                "notes",
-                "breakdown",
-            ],
-        }
-
-        payload = {
-            "generationConfig": {
-                "temperature": 0.2,
-                "maxOutputTokens": 512,
-                "responseMimeType": "application/json",
-                "responseSchema": response_schema,
-            },
-            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
-        }
-
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent"
+        url = self._url
+        # Only the prompt varies; splice its JSON string into the pre-serialized request.
+        body = _GENERATE_BODY_PREFIX + orjson.dumps(prompt) + _GENERATE_BODY_SUFFIX
 
         last_exc: Exception | None = None
         for attempt in range(3):
             response = await self._client.post(
                 url,
-                headers={"Content-Type": "application/json"},
-                params={"key": self._api_key},
-                json=payload,
+                headers=self._headers,
+                content=body,
             )
 
             if response.status_code == 429:
-                wait = 0.5 * (2**attempt)
+                wait = _retry_wait(response, default=0.5 * (2**attempt))
                 logger.warning("TEXT 429 Too Many Requests. retrying in %.1fs", wait)
                 await asyncio.sleep(wait)
                 continue
@@ -192,7 +219,7 @@ class GeminiSpeechTurnTextClient:
                 last_exc = exc
                 break
 
-            data = response.json()
+            data = orjson.loads(response.content)
             parts = (
                 data.get("candidates", [{}])[0]
                 .get("content", {})
@@ -274,15 +301,14 @@ class GeminiSpeechTurnTextClient:
             },
             "contents": [{"role": "user", "parts": [{"text": prompt}]}],
         }
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent"
+        url = self._url
         response = await self._client.post(
             url,
-            headers={"Content-Type": "application/json"},
-            params={"key": self._api_key},
-            json=payload,
+            headers=self._headers,
+            content=orjson.dumps(payload),
         )
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         parts = (
             data.get("candidates", [{}])[0]
             .get("content", {})
@@ -296,8 +322,7 @@ class GeminiSpeechTurnTextClient:
             raise ValueError("Gemini fast translation returned no content.")
 
         try:
-            s = _strip_json_fence(content)
-            payload_obj = json.loads(s)
+            payload_obj = _loads_model_json(content)
             return _build_translate_result_from_payload(payload_obj, transcript)
         except Exception:
             logger.warning(
@@ -356,15 +381,14 @@ class GeminiSpeechTurnTextClient:
             },
             "contents": [{"role": "user", "parts": [{"text": prompt}]}],
         }
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent"
+        url = self._url
         response = await self._client.post(
             url,
-            headers={"Content-Type": "application/json"},
-            params={"key": self._api_key},
-            json=payload,
+            headers=self._headers,
+            content=orjson.dumps(payload),
         )
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         parts = (
             data.get("candidates", [{}])[0]
             .get("content", {})
@@ -421,15 +445,14 @@ class GeminiSpeechTurnTextClient:
             },
             "contents": [{"role": "user", "parts": [{"text": prompt}]}],
         }
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent"
+        url = self._url
         response = await self._client.post(
             url,
-            headers={"Content-Type": "application/json"},
-            params={"key": self._api_key},
-            json=payload,
+            headers=self._headers,
+            content=orjson.dumps(payload),
         )
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         parts = (
             data.get("candidates", [{}])[0]
             .get("content", {})
@@ -514,15 +537,14 @@ class GeminiSpeechTurnTextClient:
             "contents": [{"role": "user", "parts": [{"text": prompt}]}],
         }
 
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent"
+        url = self._url
         response = await self._client.post(
             url,
-            headers={"Content-Type": "application/json"},
-            params={"key": self._api_key},
-            json=payload,
+            headers=self._headers,
+            content=orjson.dumps(payload),
         )
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         parts = (
             data.get("candidates", [{}])[0]
             .get("content", {})
@@ -535,7 +557,7 @@ class GeminiSpeechTurnTextClient:
         if not content:
             raise ValueError("Gemini breakdown generation returned no content.")
 
-        parsed = json.loads(content.strip())
+        parsed = orjson.loads(content.strip())
         return _normalize_breakdown(parsed.get("breakdown"))
 
 
@@ -546,13 +568,13 @@ class SpeechTurnService:
         tts_client,
         text_client: GeminiSpeechTurnTextClient,
         audio_dir: str,
-        ttl_seconds: int = 900,
     ) -> None:
         self._stt_client = stt_client
         self._tts_client = tts_client
         self._text_client = text_client
         self._audio_dir = audio_dir
-        self._ttl_seconds = ttl_seconds
+        # (text, voice, lang) -> (filename, meta) for clips already on disk.
+        self._tts_cache: OrderedDict[str, tuple[str, dict[str, Any]]] = OrderedDict()
 
     async def process(
         self,
@@ -610,21 +632,17 @@ class SpeechTurnService:
         target_lang: str,
         scenario: str | None,
     ) -> tuple[str, SpeechTurnTextResult, float, float]:
-        stt_start = time.perf_counter()
-        transcript = await self._stt_client.transcribe(audio_bytes, mime_type, source_lang)
-        stt_ms = (time.perf_counter() - stt_start) * 1000
-
-        llm_start = time.perf_counter()
-        if _looks_like_translate_request(transcript):
-            logger.info("Heuristic: detected translate request for transcript=%s", transcript)
-        text_result = await self._text_client.generate(
+        transcript, stt_ms = await self.transcribe(
+            audio_bytes=audio_bytes,
+            mime_type=mime_type,
+            source_lang=source_lang,
+        )
+        text_result, llm_ms = await self.generate_text(
             transcript=transcript,
             source_lang=source_lang,
             target_lang=target_lang,
             scenario=scenario,
         )
-        llm_ms = (time.perf_counter() - llm_start) * 1000
-
         return transcript, text_result, stt_ms, llm_ms
 
     async def run_text_and_llm(
@@ -639,18 +657,43 @@ class SpeechTurnService:
         if not transcript:
             raise ValueError("Text input is empty.")
 
+        text_result, llm_ms = await self.generate_text(
+            transcript=transcript,
+            source_lang=source_lang,
+            target_lang=target_lang,
+            scenario=scenario,
+        )
+        return transcript, text_result, 0.0, llm_ms
+
+    async def transcribe(
+        self,
+        *,
+        audio_bytes: bytes,
+        mime_type: str,
+        source_lang: str,
+    ) -> tuple[str, float]:
+        stt_start = time.perf_counter()
+        transcript = await self._stt_client.transcribe(audio_bytes, mime_type, source_lang)
+        return transcript, (time.perf_counter() - stt_start) * 1000
+
+    async def generate_text(
+        self,
+        *,
+        transcript: str,
+        source_lang: str,
+        target_lang: str,
+        scenario: str | None,
+    ) -> tuple[SpeechTurnTextResult, float]:
         llm_start = time.perf_counter()
         if _looks_like_translate_request(transcript):
-            logger.info("Heuristic: detected translate request for text=%s", transcript)
+            logger.info("Heuristic: detected translate request for transcript=%s", transcript)
         text_result = await self._text_client.generate(
             transcript=transcript,
             source_lang=source_lang,
             target_lang=target_lang,
             scenario=scenario,
         )
-        llm_ms = (time.perf_counter() - llm_start) * 1000
-
-        return transcript, text_result, 0.0, llm_ms
+        return text_result, (time.perf_counter() - llm_start) * 1000
 
     async def synthesize_audio(
         self,
@@ -678,21 +721,34 @@ class SpeechTurnService:
             for candidate_text in text_candidates:
                 for candidate_voice in voice_candidates:
                     try:
-                        audio_bytes, tts_meta = await self._tts_client.synthesize(
-                            candidate_text,
-                            target_lang,
-                            voice_name=candidate_voice,
-                        )
-                        if not audio_bytes:
-                            raise ValueError("TTS returned no audio bytes.")
-
-                        file_extension = str(tts_meta.get("file_extension", "wav"))
-                        filename = f"{uuid4().hex}.{file_extension}"
-                        file_path = os.path.join(self._audio_dir, filename)
-                        with open(file_path, "wb") as audio_file:
-                            audio_file.write(audio_bytes)
-
-                        self._cleanup_old_files()
+                        cache_key = _tts_cache_key(candidate_text, candidate_voice, target_lang)
+                        cached = self._tts_cache.get(cache_key)
+                        if cached is not None and await asyncio.to_thread(
+                            _touch, os.path.join(self._audio_dir, cached[0])
+                        ):
+                            self._tts_cache.move_to_end(cache_key)
+                            filename, tts_meta = cached
+                            file_extension = str(tts_meta.get("file_extension", "wav"))
+                            file_path = os.path.join(self._audio_dir, filename)
+                        else:
+                            audio_bytes, tts_meta = await self._tts_client.synthesize(
+                                candidate_text,
+                                target_lang,
+                                voice_name=candidate_voice,
+                            )
+                            if not audio_bytes:
+                                raise ValueError("TTS returned no audio bytes.")
+                            # Header and PCM are written back to back rather than
+                            # concatenated, so the clip is never copied in memory.
+                            header, tts_meta = _wav_prefix(len(audio_bytes), tts_meta)
+
+                            file_extension = str(tts_meta.get("file_extension", "wav"))
+                            filename = f"{cache_key}.{file_extension}"
+                            file_path = os.path.join(self._audio_dir, filename)
+                            await asyncio.to_thread(
+                                self._save_audio_file, file_path, header, audio_bytes
+                            )
+                            self._remember_tts(cache_key, filename, tts_meta)
 
                         audio_token = create_audio_token(filename)
                         audio_url = (
@@ -746,18 +802,64 @@ class SpeechTurnService:
         tts_ms = (time.perf_counter() - tts_start) * 1000
         return audio, audio_url, audio_mime, tts_ms, tts_error
 
-    def _cleanup_old_files(self) -> None:
-        if not os.path.exists(self._audio_dir):
-            return
-        now = time.time()
-        for entry in os.scandir(self._audio_dir):
-            if not entry.is_file():
+    def _save_audio_file(self, file_path: str, *chunks: bytes) -> None:
+        # Blocking disk I/O; called through asyncio.to_thread from synthesize_audio.
+        # Write-then-rename: cached names are reused, so a reader must never see a partial file.
+        tmp_path = f"{file_path}.{secrets.token_hex(4)}.tmp"
+        with open(tmp_path, "wb") as audio_file:
+            audio_file.writelines(chunks)
+        os.replace(tmp_path, file_path)
+
+    def _remember_tts(self, cache_key: str, filename: str, tts_meta: dict[str, Any]) -> None:
+        self._tts_cache[cache_key] = (filename, tts_meta)
+        self._tts_cache.move_to_end(cache_key)
+        while len(self._tts_cache) > TTS_CACHE_MAX_ENTRIES:
+            self._tts_cache.popitem(last=False)
+
+
+def _tts_cache_key(text: str, voice_name: str, target_lang: str) -> str:
+    return hashlib.blake2b(
+        f"{voice_name}|{target_lang}|{text}".encode(), digest_size=16
+    ).hexdigest()
+
+
+def _touch(path: str) -> bool:
+    # Refreshes mtime so the audio-dir sweeper keeps hot clips; False once it has removed them.
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def remove_expired_audio_files(audio_dir: str, ttl_seconds: int = AUDIO_FILE_TTL_SECONDS) -> int:
+    if not os.path.exists(audio_dir):
+        return 0
+    now = time.time()
+    removed = 0
+    for entry in os.scandir(audio_dir):
+        if not entry.is_file():
+            continue
+        if now - entry.stat().st_mtime > ttl_seconds:
+            try:
+                os.remove(entry.path)
+            except OSError:
                 continue
-            if now - entry.stat().st_mtime > self._ttl_seconds:
-                try:
-                    os.remove(entry.path)
-                except OSError:
-                    continue
+            removed += 1
+    return removed
+
+
+async def sweep_audio_dir(audio_dir: str, ttl_seconds: int = AUDIO_FILE_TTL_SECONDS) -> None:
+    # One directory scan per quarter-TTL instead of one per synthesized clip.
+    while True:
+        try:
+            removed = await asyncio.to_thread(remove_expired_audio_files, audio_dir, ttl_seconds)
+        except OSError as exc:
+            logger.warning("Audio dir sweep failed: %s", exc)
+        else:
+            if removed:
+                logger.info("Removed %s expired audio files", removed)
+        await asyncio.sleep(ttl_seconds / 4)
 
 
 def _normalize_notes(raw: Any) -> list[str]:
@@ -770,9 +872,21 @@ def _normalize_notes(raw: Any) -> list[str]:
     return [str(raw)]
 
 
+_JSON_FENCE_RE = re.compile(r"^```json\s*|\s*```$", re.IGNORECASE)
+
+
 def _strip_json_fence(content: str) -> str:
     s = (content or "").strip()
-    return re.sub(r"^```json\s*|\s*```$", "", s, flags=re.IGNORECASE)
+    return _JSON_FENCE_RE.sub("", s)
+
+
+def _loads_model_json(content: str) -> Any:
+    # With responseMimeType=application/json the reply is normally bare JSON, so parse the
+    # original string first; only fall back to the regex fence strip (and its copy) on failure.
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        return orjson.loads(_strip_json_fence(content))
 
 
 def _extract_first_json_object(content: str) -> str | None:
@@ -818,7 +932,7 @@ def _salvage_translate_result_from_content(
     json_object = _extract_first_json_object(content)
     if json_object:
         try:
-            payload_obj = json.loads(json_object)
+            payload_obj = orjson.loads(json_object)
             if isinstance(payload_obj, dict):
                 return _build_translate_result_from_payload(payload_obj, transcript)
         except Exception:
@@ -856,27 +970,16 @@ def _is_parse_failure_result(result: SpeechTurnTextResult) -> bool:
     )
 
 
+# One scan per transcript: the anchored "how to …" style openers, or any of the phrases
+# anywhere. ("say … in chinese" is subsumed by the bare "in chinese" phrase.)
+_TRANSLATE_REQUEST_RE = re.compile(
+    r"^\s*(?:how to|how do i|how can i|(?:what's|what is)\s+the)\s+\w"
+    r"|how do i say|how to say|teach me|translate|in mandarin|in chinese|in english"
+)
+
+
 def _looks_like_translate_request(t: str) -> bool:
-    s = (t or "").lower()
-    if re.match(r"^\s*how to\s+\w+", s):
-        return True
-    if re.match(r"^\s*how do i\s+\w+", s):
-        return True
-    if re.match(r"^\s*how can i\s+\w+", s):
-        return True
-    if re.match(r"^\s*(what's|what is)\s+the\s+\w+", s):
-        return True
-    return (
-        ("how do i say" in s)
-        or ("how to say" in s)
-        or ("teach me" in s)
-        or ("translate" in s)
-        or ("in mandarin" in s)
-        or ("say " in s and " in chinese" in s)
-        or ("say " in s and " in english" in s)
-        or ("in chinese" in s)
-        or ("in english" in s)
-    )
+    return _TRANSLATE_REQUEST_RE.search((t or "").lower()) is not None
 
 
 def _is_chinese_char(char: str) -> bool:
@@ -974,6 +1077,53 @@ def _coerce_character_breakdown(
     ]
 
 
+def _wav_header(data_len: int, sample_rate: int, channels: int, sample_width: int) -> bytes:
+    # Canonical 44-byte RIFF/WAVE header for linear PCM.
+    block_align = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_len,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        channels,
+        sample_rate,
+        sample_rate * block_align,
+        block_align,
+        sample_width * 8,
+        b"data",
+        data_len,
+    )
+
+
+def _wav_prefix(audio_len: int, tts_meta: dict[str, Any]) -> tuple[bytes, dict[str, Any]]:
+    """WAV header and meta for raw PCM (e.g. Gemini TTS output); b"" for encoded audio."""
+    if "file_extension" in tts_meta or "sample_rate_hz" not in tts_meta:
+        return b"", tts_meta
+    header = _wav_header(
+        audio_len,
+        int(tts_meta["sample_rate_hz"]),
+        int(tts_meta.get("channels", 1)),
+        int(tts_meta.get("sample_width_bytes", 2)),
+    )
+    return header, {
+        **tts_meta,
+        "mime_type": "audio/wav",
+        "file_extension": "wav",
+        "format": "wav",
+    }
+
+
+def _wrap_pcm_as_wav(
+    audio_bytes: bytes, tts_meta: dict[str, Any]
+) -> tuple[bytes, dict[str, Any]]:
+    """Prefix raw PCM (e.g. Gemini TTS output) with a WAV header; pass encoded audio through."""
+    header, meta = _wav_prefix(len(audio_bytes), tts_meta)
+    return (header + audio_bytes if header else audio_bytes), meta
+
+
 def _build_tts_voice_candidates(voice_name: str, target_lang: str) -> list[str]:
     candidates = [voice_name or DEFAULT_TTS_VOICE]
     if target_lang == "zh":
@@ -1035,10 +1185,7 @@ def _normalize_breakdown(raw: Any) -> list[SpeechTurnBreakdownItem]:
 
 def _parse_text_result(content: str, transcript: str) -> SpeechTurnTextResult:
     try:
-        s = content.strip()
-        s = re.sub(r"^```json\s*|\s*```$", "", s, flags=re.IGNORECASE)
-
-        payload = json.loads(s)
+        payload = _loads_model_json(content)
 
         intent = str(payload.get("intent") or "unknown")
         if intent not in ("translate_request", "unknown"):
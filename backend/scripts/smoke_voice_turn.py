@@ -2,25 +2,32 @@
 from __future__ import annotations
 
 import argparse
-import io
-import json
+import asyncio
+import itertools
+import math
 import os
+import secrets
+import struct
+import sys
 import time
-import wave
+from functools import lru_cache
 from pathlib import Path
 
 import httpx
+import orjson
 
 
+@lru_cache(maxsize=4)
 def _build_silence_wav(duration_ms: int = 700, sample_rate: int = 16000) -> bytes:
-    frames = int(sample_rate * (duration_ms / 1000))
-    buffer = io.BytesIO()
-    with wave.open(buffer, "wb") as handle:
-        handle.setnchannels(1)
-        handle.setsampwidth(2)
-        handle.setframerate(sample_rate)
-        handle.writeframes(b"\x00\x00" * frames)
-    return buffer.getvalue()
+    # Mono 16-bit PCM: a fixed 44-byte header followed by zero-filled samples.
+    data_len = int(sample_rate * (duration_ms / 1000)) * 2
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_len, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_len,
+    )
+    return header + bytes(data_len)
 
 
 def _require_env(name: str) -> str:
@@ -30,10 +37,9 @@ def _require_env(name: str) -> str:
     return value
 
 
-def _login(client: httpx.Client, base_url: str, username: str, password: str) -> str:
-    response = client.post(
-        f"{base_url}/auth/login",
-        headers={"X-Client-Type": "mobile"},
+async def _login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post(
+        "/auth/login",
         json={"username": username, "password": password},
     )
     response.raise_for_status()
@@ -44,27 +50,202 @@ def _login(client: httpx.Client, base_url: str, username: str, password: str) ->
     return token
 
 
-def _poll_audio_job(
-    client: httpx.Client,
-    base_url: str,
+# (jobs observed, mean completion ms, sum of squared deviations), updated with
+# Welford's method; seeds the expected duration of the next job.
+_JOB_STATS: tuple[int, float, float] = (0, 3000.0, 0.0)
+
+
+def _record_job_duration(duration_ms: float) -> None:
+    global _JOB_STATS
+    count, mean, m2 = _JOB_STATS
+    count += 1
+    delta = duration_ms - mean
+    mean += delta / count
+    _JOB_STATS = (count, mean, m2 + delta * (duration_ms - mean))
+
+
+def _expected_job_ms() -> float:
+    # Mean plus one standard deviation of the jobs seen so far, so the fast
+    # polling window covers most jobs rather than only the average one.
+    count, mean, m2 = _JOB_STATS
+    if count < 2:
+        return mean
+    return mean + math.sqrt(m2 / (count - 1))
+
+
+def _next_poll_interval(elapsed_ms: float, expected_ms: float, previous: float) -> float:
+    # Poll more often as the expected finish approaches; once it has passed,
+    # back off so slow jobs don't hammer the API.
+    if elapsed_ms < expected_ms:
+        return min(max(0.1, (expected_ms - elapsed_ms) / 4000), 1.5)
+    return min(previous * 1.5, 2.0)
+
+
+async def _poll_audio_job(
+    client: httpx.AsyncClient,
     token: str,
     job_id: str,
     timeout_seconds: int,
+    wait_ms: int = 5000,
 ) -> dict:
-    headers = {"Authorization": f"Bearer {token}", "X-Client-Type": "mobile"}
-    deadline = time.time() + timeout_seconds
-    while time.time() < deadline:
-        response = client.get(f"{base_url}/v1/speech/audio/{job_id}", headers=headers)
+    # The server holds each request for up to wait_ms and answers 200 as soon as the
+    # job finishes, or 202 if it is still pending when the window closes.
+    headers = {"Authorization": f"Bearer {token}"}
+    expected_ms = _expected_job_ms()
+    # Monotonic so clock adjustments can't cut the wait short; read once per attempt.
+    started = time.monotonic()
+    deadline = started + timeout_seconds
+    interval = 0.1
+    # The read has to outlast the server's hold window.
+    request_timeout = httpx.Timeout(60.0, connect=5.0, read=wait_ms / 1000 + 10.0)
+    while True:
+        response = await client.get(
+            f"/v1/speech/audio/{job_id}",
+            headers=headers,
+            params={"wait_ms": wait_ms},
+            timeout=request_timeout,
+        )
         response.raise_for_status()
-        payload = response.json()
-        status = payload.get("status")
-        if status in {"ready", "error"}:
-            return payload
-        time.sleep(1)
+        now = time.monotonic()
+        elapsed_ms = (now - started) * 1000
+        # Only the terminal response is decoded; pending ones are recognised from
+        # the status code or X-Job-Status header alone.
+        status = response.headers.get("X-Job-Status")
+        if response.status_code != 202 and status != "pending":
+            payload = orjson.loads(response.content)
+            if payload.get("status") in {"ready", "error"}:
+                _record_job_duration(elapsed_ms)
+                return payload
+        if response.status_code == 202:
+            # The server already held the request for the whole window; ask again
+            # straight away.
+            if now >= deadline:
+                break
+            continue
+        # A server without long-poll support answers pending at once; space those out.
+        interval = _next_poll_interval(elapsed_ms, expected_ms, interval)
+        if now + interval >= deadline:
+            break
+        await asyncio.sleep(interval)
     raise TimeoutError(f"Audio job {job_id} did not complete within {timeout_seconds}s")
 
 
-def main() -> int:
+def _multipart_field(boundary: bytes, name: str, value: str) -> bytes:
+    return b'--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n' % (
+        boundary,
+        name.encode(),
+        value.encode(),
+    )
+
+
+class _TurnBody:
+    """Multipart turn body encoded once; only voice and scenario are re-rendered per turn."""
+
+    def __init__(self, fields: dict[str, str], audio: tuple[str, bytes, str]) -> None:
+        boundary = secrets.token_hex(16).encode()
+        audio_name, audio_bytes, audio_mime = audio
+        self._boundary = boundary
+        self.content_type = f"multipart/form-data; boundary={boundary.decode()}"
+        self._shared = b"".join(
+            [
+                *(_multipart_field(boundary, name, value) for name, value in fields.items()),
+                b'--%s\r\nContent-Disposition: form-data; name="audio"; filename="%s"\r\n'
+                b"Content-Type: %s\r\n\r\n" % (boundary, audio_name.encode(), audio_mime.encode()),
+                audio_bytes,
+                b"\r\n--%s--\r\n" % boundary,
+            ]
+        )
+
+    def render(self, voice: str, scenario: str, extra: dict[str, str] | None = None) -> bytes:
+        return b"".join(
+            (
+                *(_multipart_field(self._boundary, name, value) for name, value in (extra or {}).items()),
+                _multipart_field(self._boundary, "voice", voice),
+                _multipart_field(self._boundary, "scenario", scenario),
+                self._shared,
+            )
+        )
+
+
+async def _login_and_turn(
+    client: httpx.AsyncClient,
+    username: str,
+    password: str,
+    body: _TurnBody,
+    voice: str,
+    scenario: str,
+) -> tuple[str, dict]:
+    # Login and the first turn in one round trip; the token is kept for polling
+    # and for the remaining turns.
+    response = await client.post(
+        "/v1/smoke/login-and-turn",
+        headers={"Content-Type": body.content_type},
+        content=body.render(voice, scenario, {"username": username, "password": password}),
+    )
+    response.raise_for_status()
+    payload = orjson.loads(response.content)
+    token = payload.get("auth", {}).get("access_token")
+    if not token:
+        raise RuntimeError("Login did not return access_token")
+    return token, payload["turn"]
+
+
+async def _prewarm(client: httpx.AsyncClient, token: str) -> None:
+    # Best effort: builds the speech service and the upstream connection while the
+    # first turn is in flight; over HTTP/2 it shares the turn's connection.
+    try:
+        await client.get("/v1/models/warm", headers={"Authorization": f"Bearer {token}"})
+    except httpx.HTTPError:
+        pass
+
+
+async def _run_turn(
+    client: httpx.AsyncClient,
+    token: str,
+    body: _TurnBody,
+    args: argparse.Namespace,
+    voice: str,
+    scenario: str,
+    payload: dict | None = None,
+) -> dict:
+    if payload is None:
+        response = await client.post(
+            "/v1/speech/turn",
+            headers={"Authorization": f"Bearer {token}", "Content-Type": body.content_type},
+            content=body.render(voice, scenario),
+        )
+        response.raise_for_status()
+        payload = orjson.loads(response.content)
+
+    result = {
+        "status": "ok",
+        "voice": voice,
+        "scenario": scenario,
+        "intent": payload.get("intent"),
+        "transcript": payload.get("transcript"),
+        "assistant_text": payload.get("assistant_text"),
+        "tts_error": payload.get("tts_error"),
+        "audio_ready": bool(payload.get("audio_url") or payload.get("audio_base64")),
+        "audio_pending": payload.get("audio_pending"),
+    }
+
+    if payload.get("audio_pending") and payload.get("audio_job_id"):
+        job_payload = await _poll_audio_job(
+            client=client,
+            token=token,
+            job_id=str(payload["audio_job_id"]),
+            timeout_seconds=args.timeout_seconds,
+            wait_ms=args.wait_ms,
+        )
+        result["audio_job"] = {
+            "status": job_payload.get("status"),
+            "tts_error": job_payload.get("tts_error"),
+            "audio_ready": bool(job_payload.get("audio_url") or job_payload.get("audio_base64")),
+        }
+    return result
+
+
+async def main() -> int:
     parser = argparse.ArgumentParser(description="Smoke test /v1/speech/turn")
     parser.add_argument("--base-url", default=os.getenv("SMOKE_API_BASE_URL", "http://127.0.0.1:8000"))
     parser.add_argument("--username", default=os.getenv("SMOKE_AUTH_USER"))
@@ -72,9 +253,11 @@ def main() -> int:
     parser.add_argument("--audio", default="", help="Path to a wav/m4a file. If omitted, a short silent wav is generated.")
     parser.add_argument("--source-lang", default="en")
     parser.add_argument("--target-lang", default="zh")
-    parser.add_argument("--scenario", default="restaurant")
-    parser.add_argument("--voice", default="warm", choices=["warm", "bright", "deep"])
+    parser.add_argument("--scenario", "--scenarios", dest="scenarios", nargs="+", default=["restaurant"])
+    parser.add_argument("--voice", "--voices", dest="voices", nargs="+", default=["warm"], choices=["warm", "bright", "deep"])
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum turns in flight at once.")
     parser.add_argument("--timeout-seconds", type=int, default=40)
+    parser.add_argument("--wait-ms", type=int, default=5000, help="Server-side long-poll window per audio job request.")
     args = parser.parse_args()
 
     base_url = args.base_url.rstrip("/")
@@ -95,53 +278,49 @@ def main() -> int:
         audio_bytes = _build_silence_wav()
         audio_name = "smoke.wav"
         audio_mime = "audio/wav"
+    body = _TurnBody(
+        {"level": "beginner", "source_lang": args.source_lang, "target_lang": args.target_lang},
+        (audio_name, audio_bytes, audio_mime),
+    )
 
-    with httpx.Client(timeout=60.0) as client:
-        token = _login(client, base_url, username, password)
-        headers = {"Authorization": f"Bearer {token}", "X-Client-Type": "mobile"}
-        response = client.post(
-            f"{base_url}/v1/speech/turn",
-            headers=headers,
-            data={
-                "level": "beginner",
-                "scenario": args.scenario,
-                "source_lang": args.source_lang,
-                "target_lang": args.target_lang,
-                "voice": args.voice,
-            },
-            files={"audio": (audio_name, audio_bytes, audio_mime)},
-        )
-        response.raise_for_status()
-        payload = response.json()
+    # One client and one login for the whole run; every voice/scenario turn shares
+    # the connection (multiplexed over HTTP/2 when the server offers it).
+    async with httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(60.0, connect=5.0),
+        base_url=base_url,
+        headers={"X-Client-Type": "mobile"},
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=60),
+    ) as client:
+        combinations = list(itertools.product(args.voices, args.scenarios))
+        first_turn: list = []
+        warm_task: asyncio.Task | None = None
+        if os.getenv("SMOKE_BATCH") == "1":
+            voice, scenario = combinations.pop(0)
+            token, turn_payload = await _login_and_turn(client, username, password, body, voice, scenario)
+            first_turn.append(_run_turn(client, token, body, args, voice, scenario, turn_payload))
+        else:
+            token = await _login(client, username, password)
+            # A batched login already ran a turn; otherwise warm the backend
+            # alongside the first turns.
+            warm_task = asyncio.create_task(_prewarm(client, token))
+        limiter = asyncio.Semaphore(max(1, args.concurrency))
 
-    result = {
-        "status": "ok",
-        "intent": payload.get("intent"),
-        "transcript": payload.get("transcript"),
-        "assistant_text": payload.get("assistant_text"),
-        "tts_error": payload.get("tts_error"),
-        "audio_ready": bool(payload.get("audio") or payload.get("audio_url") or payload.get("audio_base64")),
-        "audio_pending": payload.get("audio_pending"),
-    }
+        async def _limited(voice: str, scenario: str) -> dict:
+            async with limiter:
+                return await _run_turn(client, token, body, args, voice, scenario)
 
-    if payload.get("audio_pending") and payload.get("audio_job_id"):
-        with httpx.Client(timeout=30.0) as client:
-            job_payload = _poll_audio_job(
-                client=client,
-                base_url=base_url,
-                token=token,
-                job_id=str(payload["audio_job_id"]),
-                timeout_seconds=args.timeout_seconds,
-            )
-        result["audio_job"] = {
-            "status": job_payload.get("status"),
-            "tts_error": job_payload.get("tts_error"),
-            "audio_ready": bool(job_payload.get("audio_url") or job_payload.get("audio_base64")),
-        }
+        results = await asyncio.gather(
+            *first_turn,
+            *(_limited(voice, scenario) for voice, scenario in combinations),
+        )
+        if warm_task is not None:
+            await warm_task
 
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    output = results[0] if len(results) == 1 else results
+    sys.stdout.buffer.write(orjson.dumps(output, option=orjson.OPT_INDENT_2) + b"\n")
     return 0
 
 
 if __name__ == "__main__":
-    raise SystemExit(main())
+    raise SystemExit(asyncio.run(main()))
@@ -1,4 +1,120 @@
 import os
+import struct
 import sys
+from functools import lru_cache
+
+import pytest
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app, get_speech_turn_service  # noqa: E402
+from app.models.speech_turn import SpeechTurnAudio, SpeechTurnBreakdownItem  # noqa: E402
+from app.security import issue_tokens  # noqa: E402
+
+
+class FakeTextResult:
+    normalized_request = "How do I say: 'Can I get char siu?'"
+    intent = "translate_request"
+    chinese = "我可以来一份叉烧吗？"
+    pinyin = "Wǒ kěyǐ lái yí fèn chāshāo ma?"
+    notes = ["Mocked response"]
+    breakdown = [
+        SpeechTurnBreakdownItem(text="我", pronunciation="wǒ", gloss="I"),
+        SpeechTurnBreakdownItem(text="可以", pronunciation="kě yǐ", gloss="may / can"),
+    ]
+    target_text = "我可以来一份叉烧吗？"
+    romanization = "Wǒ kěyǐ lái yí fèn chāshāo ma?"
+
+
+class FakeSpeechTurnService:
+    # No text client: breakdown regeneration fails and falls back to per-character coercion.
+    _text_client = None
+
+    async def run_stt_and_llm(
+        self,
+        *,
+        audio_bytes: bytes,
+        mime_type: str,
+        source_lang: str,
+        target_lang: str,
+        scenario: str | None,
+    ):
+        return (
+            "How do I say can I get char siu",
+            FakeTextResult(),
+            10.0,
+            20.0,
+        )
+
+    async def synthesize_audio(
+        self, *, tts_text: str, target_lang: str, base_url: str, voice_name: str = "Kore"
+    ):
+        return (
+            SpeechTurnAudio(format="mp3", url=f"{base_url}static/audio/mock.mp3"),
+            f"{base_url}static/audio/mock.mp3",
+            "audio/mpeg",
+            15.0,
+            None,
+        )
+
+    async def run_text_and_llm(
+        self,
+        *,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        scenario: str | None,
+    ):
+        return (
+            text,
+            FakeTextResult(),
+            0.0,
+            20.0,
+        )
+
+
+@lru_cache(maxsize=1)
+def build_silence_wav() -> bytes:
+    data_len = 800 * 2
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_len, b"WAVE",
+        b"fmt ", 16, 1, 1, 16000, 32000, 2, 16,
+        b"data", data_len,
+    )
+    return header + bytes(data_len)
+
+
+@pytest.fixture(scope="session")
+def silent_wav() -> bytes:
+    return build_silence_wav()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def token_secrets():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("ACCESS_TOKEN_SECRET", "test-access-secret")
+        mp.setenv("REFRESH_TOKEN_SECRET", "test-refresh-secret")
+        yield
+
+
+@pytest.fixture(scope="session")
+def auth_headers(token_secrets) -> dict[str, str]:
+    # One signed token serves the whole session; it outlives any test run.
+    tokens = issue_tokens("test-user", roles=["user"], scopes=["speech:write"])
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def asgi_client():
+    # Entering the client runs the app lifespan once for the whole session.
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def speech_turn_client(asgi_client, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_speech_turn_service, lambda: FakeSpeechTurnService())
+    return asgi_client
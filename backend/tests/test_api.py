@@ -0,0 +1,190 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.main import _batch_replies, _batch_status, _parse_llm_chat_payload, app, get_http_client
+from app.security import issue_tokens
+
+
+@pytest.fixture(scope="module")
+def chat_headers(token_secrets) -> dict[str, str]:
+    tokens = issue_tokens("test-user", roles=["user"], scopes=["chat:write"])
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def _chat_body(**overrides):
+    body = {"speaker": "english", "messages": [{"role": "user", "content": "hello"}]}
+    body.update(overrides)
+    return body
+
+
+def test_parse_llm_chat_payload_accepts_valid_body() -> None:
+    request = _parse_llm_chat_payload(_chat_body())
+
+    assert request.speaker == "english"
+    assert [(m.role, m.content) for m in request.messages] == [("user", "hello")]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        _chat_body(speaker="french"),
+        _chat_body(speaker=["english"]),
+        _chat_body(messages=[{"role": "system", "content": "hi"}]),
+        _chat_body(messages=[{"role": ["user"], "content": "hi"}]),
+        _chat_body(messages=[{"role": {"user": 1}, "content": "hi"}]),
+        _chat_body(messages=[]),
+    ],
+    ids=["bad-speaker", "unhashable-speaker", "bad-role", "list-role", "dict-role", "empty-messages"],
+)
+def test_parse_llm_chat_payload_rejects_invalid_body(body) -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        _parse_llm_chat_payload(body)
+    assert exc_info.value.status_code == 422
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream"])
+def test_chat_endpoints_return_422_for_unhashable_role(asgi_client, chat_headers, path) -> None:
+    body = _chat_body(messages=[{"role": ["user"], "content": "hi"}])
+
+    response = asgi_client.post(path, json=body, headers=chat_headers)
+
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/api/chat/stream", _chat_body()),
+        ("/api/chat/batch", {"requests": [_chat_body()]}),
+    ],
+)
+def test_gemini_calls_wait_for_a_concurrency_slot(asgi_client, chat_headers, monkeypatch, path, body) -> None:
+    monkeypatch.setattr("app.main.GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr("app.main.GEMINI_QUEUE_TIMEOUT_SECONDS", 0.01)
+    monkeypatch.setattr("app.main.gemini_semaphore", asyncio.Semaphore(0))
+
+    response = asgi_client.post(path, json=body, headers=chat_headers)
+
+    assert response.status_code == 503
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/api/chat/stream", _chat_body()),
+        ("/api/chat/batch", {"requests": [_chat_body()]}),
+    ],
+)
+def test_gemini_calls_take_a_rate_limit_token(asgi_client, chat_headers, monkeypatch, path, body) -> None:
+    class RecordingBucket:
+        acquired = 0
+
+        async def acquire(self) -> None:
+            self.acquired += 1
+
+    bucket = RecordingBucket()
+    monkeypatch.setattr("app.main.GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr("app.main.GEMINI_QUEUE_TIMEOUT_SECONDS", 0.01)
+    monkeypatch.setattr("app.main.gemini_semaphore", asyncio.Semaphore(0))
+    monkeypatch.setattr("app.main.gemini_bucket", bucket)
+
+    asgi_client.post(path, json=body, headers=chat_headers)
+
+    assert bucket.acquired == 1
+
+
+def test_chat_stream_forwards_deltas_and_releases_the_slot(asgi_client, chat_headers, monkeypatch) -> None:
+    closed = []
+
+    class TrackedStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield 'data: {"candidates": [{"content": {"parts": [{"text": "你好"}]}}]}\n\n'.encode()
+
+        async def aclose(self) -> None:
+            closed.append(True)
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=TrackedStream()))
+    upstream = httpx.AsyncClient(transport=transport)
+    semaphore = asyncio.Semaphore(1)
+    monkeypatch.setattr("app.main.GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr("app.main.gemini_semaphore", semaphore)
+    monkeypatch.setitem(app.dependency_overrides, get_http_client, lambda: upstream)
+
+    response = asgi_client.post("/api/chat/stream", json=_chat_body(), headers=chat_headers)
+
+    assert response.text == 'data: {"delta":"你好"}\n\nevent: done\ndata: {}\n\n'
+    assert closed
+    assert not semaphore.locked()
+
+
+def _gemini_batch_transport(state: dict[str, str]) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(200, json={"name": "batches/test-batch"})
+        assert request.url.path.endswith("/batches/test-batch")
+        operation = {"metadata": {"state": state["value"]}}
+        if state["value"] == "BATCH_STATE_SUCCEEDED":
+            operation["response"] = {
+                "inlinedResponses": {
+                    "inlinedResponses": [
+                        {
+                            "metadata": {"key": "0"},
+                            "response": {"candidates": [{"content": {"parts": [{"text": "Chinese: 你好"}]}}]},
+                        }
+                    ]
+                }
+            }
+        return httpx.Response(200, json=operation)
+
+    return httpx.MockTransport(handler)
+
+
+def test_chat_batch_submit_then_poll_until_ready(asgi_client, chat_headers, monkeypatch) -> None:
+    state = {"value": "BATCH_STATE_RUNNING"}
+    upstream = httpx.AsyncClient(transport=_gemini_batch_transport(state))
+    monkeypatch.setattr("app.main.GEMINI_API_KEY", "test-key")
+    monkeypatch.setitem(app.dependency_overrides, get_http_client, lambda: upstream)
+
+    submitted = asgi_client.post("/api/chat/batch", json={"requests": [_chat_body()]}, headers=chat_headers)
+    job_id = submitted.json()["job_id"]
+    pending = asgi_client.get(f"/api/chat/batch/{job_id}", headers=chat_headers)
+    state["value"] = "BATCH_STATE_SUCCEEDED"
+    ready = asgi_client.get(f"/api/chat/batch/{job_id}", headers=chat_headers)
+
+    assert submitted.status_code == 200
+    assert submitted.json()["status"] == "pending"
+    assert pending.json()["status"] == "pending"
+    assert ready.json()["status"] == "ready"
+    assert ready.json()["replies"][0].startswith("Chinese: 你好")
+
+
+def test_chat_batch_poll_unknown_job_is_404(asgi_client, chat_headers) -> None:
+    response = asgi_client.get("/api/chat/batch/unknown-job", headers=chat_headers)
+
+    assert response.status_code == 404
+
+
+def test_batch_status_maps_job_states() -> None:
+    assert _batch_status("BATCH_STATE_SUCCEEDED") == "ready"
+    assert _batch_status("JOB_STATE_FAILED") == "error"
+    assert _batch_status("BATCH_STATE_CANCELLED") == "error"
+    assert _batch_status("BATCH_STATE_RUNNING") == "pending"
+    assert _batch_status("") == "pending"
+
+
+def test_batch_replies_orders_by_key_and_skips_missing() -> None:
+    def item(key, text):
+        return {"metadata": {"key": key}, "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}}
+
+    operation = {
+        "response": {
+            "inlinedResponses": {
+                "inlinedResponses": [item("2", "third"), item("0", "first"), item("9", "out of range")]
+            }
+        }
+    }
+
+    assert _batch_replies(operation, 3) == ["first", None, "third"]
@@ -1,4 +1,6 @@
 from app.main import (
+    TTLCache,
+    _extract_stream_text,
     _is_structured_beginner_reply,
     _normalize_structured_reply,
 )
@@ -29,3 +31,42 @@ def test_normalize_structured_reply_converts_english_label_to_meaning() -> None:
     assert "Meaning: hello" in normalized
     assert "English:" not in normalized
     assert "Notes: 你好，老师。" in normalized
+
+
+def test_extract_stream_text_skips_thought_parts() -> None:
+    data = {
+        "candidates": [
+            {
+                "content": {
+                    "parts": [
+                        {"thought": True, "text": "thinking..."},
+                        {"text": "Chinese: 你好"},
+                    ]
+                }
+            }
+        ]
+    }
+    assert _extract_stream_text(data) == "Chinese: 你好"
+    assert _extract_stream_text({}) == ""
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str] = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.set("a", "reply-a")
+    cache.set("b", "reply-b")
+    assert cache.get("a") == "reply-a"
+    cache.set("c", "reply-c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "reply-a"
+    assert cache.get("c") == "reply-c"
+
+
+def test_ttl_cache_expires_entries(monkeypatch) -> None:
+    import app.main as main
+
+    now = 1000.0
+    monkeypatch.setattr(main.time, "monotonic", lambda: now)
+    cache: TTLCache[dict] = TTLCache(maxsize=10, ttl_seconds=60)
+    cache.set("job", {"status": "pending"})
+    now = 1061.0
+    assert cache.get("job") is None
@@ -0,0 +1,50 @@
+import pytest
+from fastapi import HTTPException
+
+import app.main as main
+from app.main import RateLimiter
+
+
+def _freeze(monkeypatch, now: float) -> None:
+    monkeypatch.setattr(main.time, "monotonic", lambda: now)
+
+
+def test_rate_limiter_blocks_after_limit_in_window(monkeypatch):
+    limiter = RateLimiter()
+    _freeze(monkeypatch, 600.0)
+    for _ in range(3):
+        limiter.check("login", "ip", limit=3, window_seconds=60)
+
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("login", "ip", limit=3, window_seconds=60)
+    assert exc.value.status_code == 429
+    limiter.check("login", "other", limit=3, window_seconds=60)
+
+
+def test_rate_limiter_weights_previous_window(monkeypatch):
+    limiter = RateLimiter()
+    _freeze(monkeypatch, 600.0)
+    for _ in range(4):
+        limiter.check("login", "ip", limit=4, window_seconds=60)
+
+    # Halfway through the next window half of the previous count still applies.
+    _freeze(monkeypatch, 690.0)
+    limiter.check("login", "ip", limit=4, window_seconds=60)
+    limiter.check("login", "ip", limit=4, window_seconds=60)
+    with pytest.raises(HTTPException):
+        limiter.check("login", "ip", limit=4, window_seconds=60)
+
+    _freeze(monkeypatch, 800.0)
+    limiter.check("login", "ip", limit=4, window_seconds=60)
+
+
+def test_rate_limiter_evicts_stale_keys(monkeypatch):
+    limiter = RateLimiter()
+    _freeze(monkeypatch, 600.0)
+    limiter.check("login", "stale", limit=1, window_seconds=60)
+
+    _freeze(monkeypatch, 1000.0)
+    for i in range(RateLimiter.GC_EVERY):
+        limiter.check("login", f"fresh-{i % 2}", limit=10_000, window_seconds=60)
+
+    assert "stale" not in limiter._buckets["login"]
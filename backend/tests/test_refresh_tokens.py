@@ -0,0 +1,89 @@
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app import security
+from app.security import (
+    REFRESH_TOKEN_STORE,
+    AuthError,
+    issue_tokens,
+    purge_expired_refresh_tokens,
+    rotate_refresh_token,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_refresh_store():
+    REFRESH_TOKEN_STORE.clear()
+    security._REFRESH_EXPIRY_HEAP.clear()
+    yield
+    REFRESH_TOKEN_STORE.clear()
+    security._REFRESH_EXPIRY_HEAP.clear()
+
+
+def test_issuing_tokens_purges_expired_refresh_tokens(monkeypatch):
+    old = issue_tokens("test-user", roles=["user"], scopes=[])
+
+    later = security._now() + security.REFRESH_TOKEN_TTL_DAYS * 86400 + 3600
+    monkeypatch.setattr(security, "_now", lambda: later)
+    live = issue_tokens("test-user", roles=["user"], scopes=[])
+
+    assert old["refresh_jti"] not in REFRESH_TOKEN_STORE
+    assert live["refresh_jti"] in REFRESH_TOKEN_STORE
+    assert purge_expired_refresh_tokens() == 0
+
+
+def test_rotate_rejects_replayed_and_forged_refresh_tokens():
+    first = issue_tokens("test-user", roles=["user"], scopes=[])
+    second = rotate_refresh_token(first["refresh_token"])
+
+    with pytest.raises(AuthError):
+        rotate_refresh_token(first["refresh_token"])
+    with pytest.raises(AuthError):
+        rotate_refresh_token("not-a-jwt")
+
+    forged = jwt.encode(
+        {"type": "refresh", "jti": second["refresh_jti"], "sub": "attacker"},
+        "wrong-secret",
+        algorithm="HS256",
+    )
+    with pytest.raises(AuthError) as exc_info:
+        rotate_refresh_token(forged)
+    assert exc_info.value.status_code == 401
+    assert second["refresh_jti"] in REFRESH_TOKEN_STORE
+
+
+def test_rotation_keeps_the_expiry_heap_bounded():
+    tokens = issue_tokens("test-user", roles=["user"], scopes=[])
+    for _ in range(500):
+        tokens = rotate_refresh_token(tokens["refresh_token"])
+
+    assert list(REFRESH_TOKEN_STORE) == [tokens["refresh_jti"]]
+    assert len(security._REFRESH_EXPIRY_HEAP) <= 2 * len(REFRESH_TOKEN_STORE) + 64
+    assert (tokens["refresh_expires_at"], tokens["refresh_jti"]) in security._REFRESH_EXPIRY_HEAP
+
+
+def test_full_refresh_store_keeps_live_sessions(monkeypatch):
+    monkeypatch.setattr(security, "MAX_REFRESH_STORE", 2)
+    first, second = (issue_tokens("test-user", roles=["user"], scopes=[]) for _ in range(2))
+
+    with pytest.raises(HTTPException) as exc_info:
+        issue_tokens("burst-user", roles=["user"], scopes=[])
+    assert exc_info.value.status_code == 503
+    assert list(REFRESH_TOKEN_STORE) == [first["refresh_jti"], second["refresh_jti"]]
+
+    rotated = rotate_refresh_token(first["refresh_token"])
+    assert rotated["refresh_jti"] in REFRESH_TOKEN_STORE
+    assert second["refresh_jti"] in REFRESH_TOKEN_STORE
+
+
+def test_full_refresh_store_purges_expired_sessions_first(monkeypatch):
+    monkeypatch.setattr(security, "MAX_REFRESH_STORE", 2)
+    for _ in range(2):
+        issue_tokens("test-user", roles=["user"], scopes=[])
+
+    later = security._now() + security.REFRESH_TOKEN_TTL_DAYS * 86400 + 3600
+    monkeypatch.setattr(security, "_now", lambda: later)
+    fresh = issue_tokens("test-user", roles=["user"], scopes=[])
+
+    assert list(REFRESH_TOKEN_STORE) == [fresh["refresh_jti"]]
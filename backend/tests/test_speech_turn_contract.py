@@ -1,101 +1,26 @@
+import asyncio
 import io
-import wave
-
-import os
-
-from fastapi.testclient import TestClient
-
-from app.main import app, get_speech_turn_service
-from app.security import issue_tokens
-from app.models.speech_turn import SpeechTurnAnalysis, SpeechTurnAudio, SpeechTurnResponse
-
-
-class FakeTextResult:
-    normalized_request = "How do I say: 'Can I get char siu?'"
-    intent = "translate_request"
-    chinese = "我可以来一份叉烧吗？"
-    pinyin = "Wǒ kěyǐ lái yí fèn chāshāo ma?"
-    notes = ["Mocked response"]
-    breakdown = [
-        {"text": "我", "pronunciation": "wǒ", "gloss": "I"},
-        {"text": "可以", "pronunciation": "kě yǐ", "gloss": "may / can"},
-    ]
-    target_text = "我可以来一份叉烧吗？"
-    romanization = "Wǒ kěyǐ lái yí fèn chāshāo ma?"
-
-
-class FakeSpeechTurnService:
-    async def run_stt_and_llm(
-        self,
-        *,
-        audio_bytes: bytes,
-        mime_type: str,
-        source_lang: str,
-        target_lang: str,
-        scenario: str | None,
-    ):
-        return (
-            "How do I say can I get char siu",
-            FakeTextResult(),
-            10.0,
-            20.0,
-        )
-
-    async def synthesize_audio(
-        self, *, tts_text: str, target_lang: str, base_url: str, voice_name: str = "Kore"
-    ):
-        return (
-            SpeechTurnAudio(format="mp3", url=f"{base_url}static/audio/mock.mp3"),
-            f"{base_url}static/audio/mock.mp3",
-            "audio/mpeg",
-            15.0,
-            None,
-        )
-
-    async def run_text_and_llm(
-        self,
-        *,
-        text: str,
-        source_lang: str,
-        target_lang: str,
-        scenario: str | None,
-    ):
-        return (
-            text,
-            FakeTextResult(),
-            0.0,
-            20.0,
-        )
-
-
-
-def _auth_headers() -> dict[str, str]:
-    os.environ["ACCESS_TOKEN_SECRET"] = "test-access-secret"
-    os.environ["REFRESH_TOKEN_SECRET"] = "test-refresh-secret"
-    tokens = issue_tokens("test-user", roles=["user"], scopes=["speech:write"])
-    return {"Authorization": f"Bearer {tokens['access_token']}"}
-def build_silence_wav() -> bytes:
-    buffer = io.BytesIO()
-    with wave.open(buffer, "wb") as handle:
-        handle.setnchannels(1)
-        handle.setsampwidth(2)
-        handle.setframerate(16000)
-        handle.writeframes(b"\x00\x00" * 800)
-    return buffer.getvalue()
-
-
-def test_speech_turn_contract():
-    app.dependency_overrides[get_speech_turn_service] = lambda: FakeSpeechTurnService()
-    client = TestClient(app)
-    response = client.post(
+import itertools
+import time
+import types
+
+import httpx
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.main import AUDIO_JOBS, _read_upload, app, get_speech_turn_service
+from app.security import password_hasher
+from conftest import FakeSpeechTurnService
+
+
+def test_speech_turn_contract(speech_turn_client, silent_wav, auth_headers):
+    response = speech_turn_client.post(
         "/v1/speech/turn",
         data={"scenario": "restaurant"},
-        headers=_auth_headers(),
-        files={"audio": ("sample.wav", build_silence_wav(), "audio/wav")},
+        headers=auth_headers,
+        files={"audio": ("sample.wav", silent_wav, "audio/wav")},
     )
 
-    app.dependency_overrides.clear()
-
     assert response.status_code == 200
     payload = response.json()
     assert "transcript" in payload
@@ -108,19 +33,147 @@ def test_speech_turn_contract():
     assert isinstance(payload["analysis"]["phoneme_confidence"], list)
 
 
-def test_speech_turn_contract_text_only():
-    app.dependency_overrides[get_speech_turn_service] = lambda: FakeSpeechTurnService()
-    client = TestClient(app)
-    response = client.post(
+def test_speech_turn_contract_text_only(speech_turn_client, auth_headers):
+    response = speech_turn_client.post(
         "/v1/speech/turn",
         data={"text": "I love you", "scenario": "general"},
-        headers=_auth_headers(),
+        headers=auth_headers,
     )
 
-    app.dependency_overrides.clear()
-
     assert response.status_code == 200
     payload = response.json()
     assert payload["transcript"] == "I love you"
     assert "breakdown" in payload
     assert payload["audio"].get("url") or payload["audio"].get("base64")
+
+
+def test_speech_audio_job_long_poll_returns_202_while_pending(asgi_client, auth_headers):
+    job = {"status": "pending", "audio_url": None, "owner_id": "test-user"}
+    AUDIO_JOBS.set("long-poll-job", job)
+
+    pending = asgi_client.get("/v1/speech/audio/long-poll-job", params={"wait_ms": 10}, headers=auth_headers)
+    AUDIO_JOBS.set("long-poll-job", {**job, "status": "ready", "audio_url": "http://x/a.wav"})
+    ready = asgi_client.get("/v1/speech/audio/long-poll-job", params={"wait_ms": 10}, headers=auth_headers)
+
+    assert pending.status_code == 202
+    assert pending.headers["X-Job-Status"] == "pending"
+    assert pending.json()["status"] == "pending"
+    assert ready.status_code == 200
+    assert ready.headers["X-Job-Status"] == "ready"
+    assert ready.json()["audio_url"] == "http://x/a.wav"
+
+
+def test_failed_audio_job_is_reported_to_long_polls(asgi_client, auth_headers, monkeypatch):
+    class FailingTTSService(FakeSpeechTurnService):
+        async def synthesize_audio(self, *, tts_text, target_lang, base_url, voice_name="Kore"):
+            raise RuntimeError("tts down")
+
+    # Every perf_counter read is 20 s later, so the turn takes the pending-audio path.
+    clock = itertools.count(step=20.0)
+    fake_time = types.SimpleNamespace(perf_counter=lambda: next(clock), monotonic=time.monotonic)
+    monkeypatch.setattr("app.main.time", fake_time)
+    monkeypatch.setitem(app.dependency_overrides, get_speech_turn_service, lambda: FailingTTSService())
+
+    turn = asgi_client.post(
+        "/v1/speech/turn",
+        headers=auth_headers,
+        data={"text": "I love you", "scenario": "general"},
+    )
+    job_id = turn.json()["audio_job_id"]
+    job = asgi_client.get(f"/v1/speech/audio/{job_id}", params={"wait_ms": 5000}, headers=auth_headers)
+
+    assert turn.json()["audio_pending"] is True
+    assert job.status_code == 200
+    assert job.json()["status"] == "error"
+    assert job.json()["tts_error"] == "RuntimeError: tts down"
+
+
+@pytest.fixture
+def smoke_login(monkeypatch):
+    monkeypatch.setattr("app.main.SMOKE_ENDPOINTS_ENABLED", True)
+    monkeypatch.setenv("AUTH_DEFAULT_USER", "smoke-user")
+    monkeypatch.setenv("AUTH_DEFAULT_PASSWORD_HASH", password_hasher.hash("smoke-password"))
+
+
+def test_smoke_login_and_turn_returns_both_payloads(speech_turn_client, silent_wav, smoke_login):
+    response = speech_turn_client.post(
+        "/v1/smoke/login-and-turn",
+        data={"username": "smoke-user", "password": "smoke-password", "scenario": "restaurant"},
+        files={"audio": ("sample.wav", silent_wav, "audio/wav")},
+    )
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["auth"]["access_token"]
+    assert payload["auth"]["refresh_token"]
+    assert payload["turn"]["transcript"] == "How do I say can I get char siu"
+
+
+def test_smoke_login_and_turn_keeps_web_refresh_token_in_cookie(speech_turn_client, smoke_login):
+    response = speech_turn_client.post(
+        "/v1/smoke/login-and-turn",
+        headers={"X-Client-Type": "web"},
+        data={"username": "smoke-user", "password": "smoke-password", "text": "I love you"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["auth"]["refresh_token"] is None
+    assert "refresh_token=" in response.headers["set-cookie"]
+
+
+def test_smoke_login_and_turn_charges_turn_quota_only_after_login(speech_turn_client, smoke_login, monkeypatch):
+    charged = []
+    monkeypatch.setattr("app.main.rate_limiter.check", lambda route, *args, **kwargs: charged.append(route))
+    response = speech_turn_client.post(
+        "/v1/smoke/login-and-turn",
+        data={"username": "smoke-user", "password": "wrong-password", "text": "I love you"},
+    )
+
+    assert response.status_code == 401
+    assert charged == ["login"]
+
+
+def test_smoke_login_and_turn_is_off_by_default(speech_turn_client):
+    response = speech_turn_client.post(
+        "/v1/smoke/login-and-turn",
+        data={"username": "smoke-user", "password": "smoke-password", "text": "I love you"},
+    )
+
+    assert response.status_code == 404
+
+
+def test_speech_turn_contract_concurrent_scenarios(silent_wav, auth_headers, monkeypatch):
+    scenarios = ["restaurant", "general", "travel", "shopping"]
+    monkeypatch.setitem(app.dependency_overrides, get_speech_turn_service, lambda: FakeSpeechTurnService())
+
+    async def _run() -> list[httpx.Response]:
+        limiter = asyncio.Semaphore(4)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+            async def _post(scenario: str) -> httpx.Response:
+                async with limiter:
+                    return await client.post(
+                        "/v1/speech/turn",
+                        data={"scenario": scenario},
+                        headers=auth_headers,
+                        files={"audio": ("sample.wav", silent_wav, "audio/wav")},
+                    )
+
+            return await asyncio.gather(*(_post(scenario) for scenario in scenarios))
+
+    responses = asyncio.run(_run())
+
+    assert [response.status_code for response in responses] == [200] * len(scenarios)
+    assert [response.json()["scenario"] for response in responses] == scenarios
+
+
+def test_read_upload_rejects_oversized_upload_unread():
+    small = UploadFile(io.BytesIO(bytes(16)), size=16)
+    large = UploadFile(io.BytesIO(bytes(64)), size=64)
+
+    assert asyncio.run(_read_upload(small, 32)) == bytes(16)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(_read_upload(large, 32))
+    assert exc_info.value.status_code == 413
+    assert large.file.tell() == 0
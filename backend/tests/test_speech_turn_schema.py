@@ -1,116 +1,25 @@
-import io
-import wave
+from app.models.speech_turn import SpeechTurnResponse
 
-import os
 
-from fastapi.testclient import TestClient
-
-from app.main import app, get_speech_turn_service
-from app.security import issue_tokens
-from app.models.speech_turn import SpeechTurnAnalysis, SpeechTurnAudio, SpeechTurnResponse
-
-
-class FakeTextResult:
-    normalized_request = "How do I say: 'Can I get char siu?'"
-    intent = "translate_request"
-    chinese = "我可以来一份叉烧吗？"
-    pinyin = "Wǒ kěyǐ lái yí fèn chāshāo ma?"
-    notes = ["Mocked response"]
-    breakdown = [
-        {"text": "我", "pronunciation": "wǒ", "gloss": "I"},
-        {"text": "可以", "pronunciation": "kě yǐ", "gloss": "may / can"},
-    ]
-    target_text = "我可以来一份叉烧吗？"
-    romanization = "Wǒ kěyǐ lái yí fèn chāshāo ma?"
-
-
-class FakeSpeechTurnService:
-    async def run_stt_and_llm(
-        self,
-        *,
-        audio_bytes: bytes,
-        mime_type: str,
-        source_lang: str,
-        target_lang: str,
-        scenario: str | None,
-    ):
-        return (
-            "How do I say can I get char siu",
-            FakeTextResult(),
-            10.0,
-            20.0,
-        )
-
-    async def synthesize_audio(
-        self, *, tts_text: str, target_lang: str, base_url: str, voice_name: str = "Kore"
-    ):
-        return (
-            SpeechTurnAudio(format="mp3", url=f"{base_url}static/audio/mock.mp3"),
-            f"{base_url}static/audio/mock.mp3",
-            "audio/mpeg",
-            15.0,
-            None,
-        )
-
-    async def run_text_and_llm(
-        self,
-        *,
-        text: str,
-        source_lang: str,
-        target_lang: str,
-        scenario: str | None,
-    ):
-        return (
-            text,
-            FakeTextResult(),
-            0.0,
-            20.0,
-        )
-
-
-
-def _auth_headers() -> dict[str, str]:
-    os.environ["ACCESS_TOKEN_SECRET"] = "test-access-secret"
-    os.environ["REFRESH_TOKEN_SECRET"] = "test-refresh-secret"
-    tokens = issue_tokens("test-user", roles=["user"], scopes=["speech:write"])
-    return {"Authorization": f"Bearer {tokens['access_token']}"}
-def build_silence_wav() -> bytes:
-    buffer = io.BytesIO()
-    with wave.open(buffer, "wb") as handle:
-        handle.setnchannels(1)
-        handle.setsampwidth(2)
-        handle.setframerate(16000)
-        handle.writeframes(b"\x00\x00" * 800)
-    return buffer.getvalue()
-
-
-def test_speech_turn_schema():
-    app.dependency_overrides[get_speech_turn_service] = lambda: FakeSpeechTurnService()
-    client = TestClient(app)
-    response = client.post(
+def test_speech_turn_schema(speech_turn_client, silent_wav, auth_headers):
+    response = speech_turn_client.post(
         "/v1/speech/turn",
-        headers=_auth_headers(),
-        files={"audio": ("sample.wav", build_silence_wav(), "audio/wav")},
+        headers=auth_headers,
+        files={"audio": ("sample.wav", silent_wav, "audio/wav")},
     )
 
-    app.dependency_overrides.clear()
-
     assert response.status_code == 200
     payload = response.json()
     SpeechTurnResponse.model_validate(payload)
 
 
-def test_speech_turn_schema_text_only():
-    app.dependency_overrides[get_speech_turn_service] = lambda: FakeSpeechTurnService()
-    client = TestClient(app)
-    response = client.post(
+def test_speech_turn_schema_text_only(speech_turn_client, auth_headers):
+    response = speech_turn_client.post(
         "/v1/speech/turn",
-        headers=_auth_headers(),
+        headers=auth_headers,
         data={"text": "I love you", "source_lang": "en", "target_lang": "zh"},
     )
 
-    app.dependency_overrides.clear()
-
     assert response.status_code == 200
     payload = response.json()
     SpeechTurnResponse.model_validate(payload)
@@ -0,0 +1,62 @@
+from app.main import app, get_speech_turn_service
+from app.models.speech_turn import SpeechTurnBreakdownItem
+from app.services.speech_turn import SpeechTurnService, SpeechTurnTextResult
+
+
+class FakeSTTClient:
+    async def transcribe(self, audio_bytes: bytes, mime_type: str, source_lang: str) -> str:
+        return "How do I say hello"
+
+
+class FakeTextClient:
+    async def generate(self, transcript, source_lang, target_lang, scenario):
+        return SpeechTurnTextResult(
+            normalized_request="How do I say: 'hello'?",
+            intent="translate_request",
+            target_text="你好",
+            romanization="nǐ hǎo",
+            chinese="你好",
+            pinyin="nǐ hǎo",
+            notes=[],
+            breakdown=[
+                SpeechTurnBreakdownItem(text="你", pronunciation="nǐ", gloss="you"),
+                SpeechTurnBreakdownItem(text="好", pronunciation="hǎo", gloss="good"),
+            ],
+        )
+
+
+class FakeTTSClient:
+    async def synthesize(self, text: str, target_lang: str, voice_name: str = "Kore"):
+        return b"\x00\x00" * 100, {"sample_rate_hz": 24000, "channels": 1, "sample_width_bytes": 2}
+
+
+def _events(body: str) -> list[str]:
+    return [line[len("event: "):] for line in body.splitlines() if line.startswith("event: ")]
+
+
+def test_speech_turn_stream_emits_stages_in_order(asgi_client, tmp_path, monkeypatch):
+    service = SpeechTurnService(
+        stt_client=FakeSTTClient(),
+        tts_client=FakeTTSClient(),
+        text_client=FakeTextClient(),
+        audio_dir=str(tmp_path),
+    )
+    monkeypatch.setitem(app.dependency_overrides, get_speech_turn_service, lambda: service)
+    response = asgi_client.post(
+        "/v1/speech/turn/stream",
+        data={"target_lang": "zh"},
+        files={"audio": ("sample.wav", b"RIFF0000WAVE", "audio/wav")},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert _events(response.text) == ["transcript", "text", "audio", "done"]
+    assert '"transcript":"How do I say hello"' in response.text
+    assert "/static/audio/" in response.text
+
+
+def test_speech_turn_stream_requires_input(asgi_client, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_speech_turn_service, lambda: object())
+    response = asgi_client.post("/v1/speech/turn/stream", data={"scenario": "general"})
+
+    assert response.status_code == 400
@@ -1,10 +1,15 @@
+import asyncio
+import io
 import os
+import wave
 
 from app.main import _resolve_voice_name
 from app.services.speech_turn import (
     SpeechTurnService,
     _build_tts_text_candidates,
     _build_tts_voice_candidates,
+    _wrap_pcm_as_wav,
+    remove_expired_audio_files,
 )
 
 
@@ -26,9 +31,9 @@ def test_resolve_voice_name_map():
     assert _resolve_voice_name("unknown") == "Kore"
 
 
-def test_tts_fallback_to_default_voice(tmp_path):
-    os.environ["ACCESS_TOKEN_SECRET"] = "test-access-secret"
-    os.environ["REFRESH_TOKEN_SECRET"] = "test-refresh-secret"
+def test_tts_fallback_to_default_voice(tmp_path, monkeypatch):
+    monkeypatch.setenv("ACCESS_TOKEN_SECRET", "test-access-secret")
+    monkeypatch.setenv("REFRESH_TOKEN_SECRET", "test-refresh-secret")
 
     tts_client = _FailThenSucceedTTSClient()
     service = SpeechTurnService(
@@ -38,8 +43,6 @@ def test_tts_fallback_to_default_voice(tmp_path):
         audio_dir=str(tmp_path),
     )
 
-    import asyncio
-
     audio, audio_url, audio_mime, _, tts_error = asyncio.run(service.synthesize_audio(
         tts_text="你好",
         target_lang="zh",
@@ -54,6 +57,45 @@ def test_tts_fallback_to_default_voice(tmp_path):
     assert tts_client.calls == ["Leda", "Kore"]
 
 
+def test_synthesize_audio_reuses_cached_clip(tmp_path, monkeypatch):
+    monkeypatch.setenv("ACCESS_TOKEN_SECRET", "test-access-secret")
+    tts_client = _FailThenSucceedTTSClient()
+    service = SpeechTurnService(
+        stt_client=object(),
+        tts_client=tts_client,
+        text_client=object(),
+        audio_dir=str(tmp_path),
+    )
+
+    async def _twice():
+        first = await service.synthesize_audio(
+            tts_text="你好", target_lang="zh", base_url="https://api.example.com"
+        )
+        second = await service.synthesize_audio(
+            tts_text="你好", target_lang="zh", base_url="https://api.example.com"
+        )
+        return first, second
+
+    first, second = asyncio.run(_twice())
+
+    assert tts_client.calls == ["Kore"]
+    assert first[0].url.split("?")[0] == second[0].url.split("?")[0]
+    assert second[2] == "audio/wav"
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_remove_expired_audio_files(tmp_path):
+    stale = tmp_path / "stale.wav"
+    stale.write_bytes(b"old")
+    os.utime(stale, (0, 0))
+    fresh = tmp_path / "fresh.wav"
+    fresh.write_bytes(b"new")
+
+    assert remove_expired_audio_files(str(tmp_path), ttl_seconds=900) == 1
+    assert not stale.exists()
+    assert fresh.exists()
+
+
 def test_build_tts_voice_candidates_for_zh():
     assert _build_tts_voice_candidates("Puck", "zh") == ["Puck", "Kore", "Leda"]
     assert _build_tts_voice_candidates("Kore", "zh") == ["Kore", "Leda", "Puck"]
@@ -62,3 +104,26 @@ def test_build_tts_voice_candidates_for_zh():
 def test_build_tts_text_candidates_adds_sanitized_variant():
     assert _build_tts_text_candidates("一，二，三") == ["一，二，三", "一 二 三"]
     assert _build_tts_text_candidates("你好") == ["你好"]
+
+
+def test_wrap_pcm_as_wav_matches_wave_module():
+    pcm = b"\x01\x02" * 800
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(24000)
+        handle.writeframes(pcm)
+
+    wav_bytes, meta = _wrap_pcm_as_wav(
+        pcm, {"sample_rate_hz": 24000, "channels": 1, "sample_width_bytes": 2}
+    )
+
+    assert wav_bytes == buffer.getvalue()
+    assert meta["mime_type"] == "audio/wav"
+    assert meta["file_extension"] == "wav"
+
+
+def test_wrap_pcm_as_wav_passes_encoded_audio_through():
+    meta = {"mime_type": "audio/mpeg", "file_extension": "mp3", "format": "mp3"}
+    assert _wrap_pcm_as_wav(b"ID3", meta) == (b"ID3", meta)